@@ -1,25 +1,89 @@
 """Flask app factory."""
 
+import os
+from pathlib import Path
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import event
 from config import config
 
+try:
+    import orjson
+except ImportError:  # Fall back to the stdlib json provider
+    orjson = None
+
 # Initialize extensions
 db = SQLAlchemy()
 migrate = Migrate()
 
+# Fragments the big screens poll; compiled at startup instead of on the first poll
+PRECOMPILED_TEMPLATES = (
+    'components/welcome_screen.html',
+    'components/no_photos.html',
+    'components/photo_display.html',
+    'components/photo_queue.html',
+    'components/music_queue.html',
+)
+
+
+def _set_sqlite_pragmas(dbapi_conn, connection_record):
+    """Enable WAL so guest uploads aren't blocked by indexer writes."""
+    cursor = dbapi_conn.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA mmap_size=268435456')  # 256MB
+    cursor.execute('PRAGMA cache_size=-65536')  # 64MB
+    cursor.close()
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, keeping Flask's output conventions."""
+
+    def dumps(self, obj, **kwargs):
+        # Datetimes go through Flask's default() so they keep the HTTP date format
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        # Hooks (e.g. the session serializer's object_hook) need the stdlib decoder
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
 
 def create_app(config_name='default'):
     """Create Flask application using app factory pattern."""
     
     app = Flask(__name__, template_folder='../templates', static_folder='static')
     app.config.from_object(config[config_name])
+    if orjson:
+        app.json = OrjsonProvider(app)
     config[config_name].init_app(app)
     
+    # Resolve media folders once; media routes join filenames onto these strings
+    upload_folder = Path(app.config['UPLOAD_FOLDER'])
+    app.extensions['media_dirs'] = {
+        'photos': os.fspath(upload_folder.resolve()),
+        'thumbnails': os.fspath((upload_folder.parent / 'thumbnails').resolve()),
+        'music': os.fspath(Path(app.config['MUSIC_COPY_FOLDER']).resolve()),
+    }
+    
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
+
+    # Warm the connection pool so the first guest request skips the connect
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', _set_sqlite_pragmas)
+        db.engine.connect().close()
     
     # Register blueprints
     from app.routes.mobile import mobile_bp
@@ -38,6 +102,9 @@ def create_app(config_name='default'):
     from app.routes import main_bp
     app.register_blueprint(main_bp)
     
+    for template in PRECOMPILED_TEMPLATES:
+        app.jinja_env.get_template(template)
+    
     # Note: Media file routes are handled by app/routes/__init__.py
     
     return app
\ No newline at end of file
@@ -1,15 +1,28 @@
 """Database models for Birthday Party Memory & Music App - PRD Schema."""
 
 import datetime
+import time
 from app import db
 
+# Seconds before cached settings are re-read, so other workers' updates show up
+SETTINGS_CACHE_TTL = 5
+
+# In-process copy of the settings table, refreshed in one query when stale
+_settings_cache = {'values': None, 'loaded_at': 0.0}
+
+# Seconds the big screens' stats polls may reuse the party counts
+PARTY_COUNTS_CACHE_TTL = 3
+
+# In-process copy of get_party_counts() for those polls
+_party_counts_cache = {'values': None, 'loaded_at': 0.0}
+
 
 class Guest(db.Model):
     """Users/Guests table."""
     __tablename__ = 'guests'
     
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)  # First name or full name
+    name = db.Column(db.String(100), nullable=False, index=True)  # First name or full name; looked up on every submission
     session_id = db.Column(db.String(255), unique=True, index=True, nullable=False)
     first_seen = db.Column(db.DateTime, default=datetime.datetime.now)
     total_submissions = db.Column(db.Integer, default=0)
@@ -24,12 +37,12 @@ class Photo(db.Model):
     __tablename__ = 'photos'
 
     id = db.Column(db.Integer, primary_key=True)
-    guest_id = db.Column(db.Integer, db.ForeignKey('guests.id'), nullable=True)
+    guest_id = db.Column(db.Integer, db.ForeignKey('guests.id'), nullable=True, index=True)  # Guest's wish lookup
     guest_name = db.Column(db.String(100), nullable=False)  # Stored for easy access
     filename = db.Column(db.String(255), nullable=True)
     original_filename = db.Column(db.String(255), nullable=True)
     wish_message = db.Column(db.Text, nullable=False)  # Birthday wish/note with full emoji support
-    uploaded_at = db.Column(db.DateTime, default=datetime.datetime.now)
+    uploaded_at = db.Column(db.DateTime, default=datetime.datetime.now, index=True)  # Slideshow/recent ordering
     displayed_at = db.Column(db.DateTime, nullable=True)
     display_duration = db.Column(db.Integer, default=10)  # Seconds to show on screen
     file_size = db.Column(db.Integer, default=0)  # bytes
@@ -40,6 +53,13 @@ class Photo(db.Model):
     # Relationship to associated music
     music = db.relationship('MusicQueue', backref='photo', lazy=True, foreign_keys='MusicQueue.photo_id')
 
+    # Partial index so counting not-yet-displayed photos stays cheap
+    __table_args__ = (
+        db.Index('idx_photos_pending', 'displayed_at',
+                 sqlite_where=db.text('displayed_at IS NULL'),
+                 postgresql_where=db.text('displayed_at IS NULL')),
+    )
+
 
 class MusicQueue(db.Model):
     """Music submissions."""
@@ -57,6 +77,29 @@ class MusicQueue(db.Model):
     played_at = db.Column(db.DateTime, nullable=True)
     submitted_at = db.Column(db.DateTime, default=datetime.datetime.now)
 
+    # Wish from the requesting guest's first photo, for the player. Deferred;
+    # undefer() it to read it in the same query as the song.
+    guest_wish = db.column_property(
+        db.select(Photo.wish_message)
+            .where(Photo.guest_id == guest_id)
+            .order_by(Photo.id)
+            .limit(1)
+            .correlate_except(Photo)
+            .scalar_subquery(),
+        deferred=True
+    )
+
+    # Admin views and the player filter by status; per-guest lookups go by time.
+    # The player's "next unplayed ready song" polls seek and read in order on
+    # idx_music_queue_player without a sort; "previous" (latest played ready
+    # song) reads idx_music_queue_played backwards the same way.
+    __table_args__ = (
+        db.Index('idx_music_queue_status', 'status'),
+        db.Index('idx_music_queue_guest_time', 'guest_id', 'submitted_at'),
+        db.Index('idx_music_queue_player', 'played_at', 'status', 'submitted_at'),
+        db.Index('idx_music_queue_played', 'status', 'played_at'),
+    )
+
 
 class MusicLibrary(db.Model):
     """Local music library index."""
@@ -71,7 +114,7 @@ class MusicLibrary(db.Model):
     duration = db.Column(db.Integer, nullable=True)  # seconds
     file_path = db.Column(db.String(500), nullable=False, unique=True, index=True)
     file_size = db.Column(db.Integer, default=0)
-    indexed_at = db.Column(db.DateTime, default=datetime.datetime.now)
+    indexed_at = db.Column(db.DateTime, default=datetime.datetime.now, index=True)  # Recent tracks list
     
     # Lowercase fields for case-insensitive search
     title_lower = db.Column(db.String(200), nullable=True, index=True)
@@ -101,6 +144,41 @@ class Settings(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.datetime.now)
 
 
+def get_party_counts():
+    """Photo, guest, music request and pending photo counts in one round-trip."""
+    stmt = db.select(
+        db.select(db.func.count(Photo.id)).scalar_subquery().label('total_photos'),
+        db.select(db.func.count(Guest.id)).scalar_subquery().label('total_guests'),
+        db.select(db.func.count(MusicQueue.id)).scalar_subquery().label('music_requests'),
+        db.select(db.func.count(Photo.id)).where(Photo.displayed_at.is_(None))
+            .scalar_subquery().label('pending_photos'),
+    )
+    return dict(db.session.execute(stmt).mappings().one())
+
+
+def get_recent_party_counts():
+    """get_party_counts(), reused for up to PARTY_COUNTS_CACHE_TTL seconds.
+
+    For the polled stats endpoints; admin pages read fresh counts.
+    """
+    now = time.monotonic()
+    values = _party_counts_cache['values']
+    if values is None or now - _party_counts_cache['loaded_at'] > PARTY_COUNTS_CACHE_TTL:
+        values = get_party_counts()
+        _party_counts_cache['values'] = values
+        _party_counts_cache['loaded_at'] = now
+    return values
+
+
+def _dialect_insert():
+    """Return the INSERT construct supporting ON CONFLICT for the current database."""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
 def init_default_settings():
     """Initialize default settings if they don't exist."""
     default_settings = [
@@ -119,29 +197,68 @@ def init_default_settings():
         ('external_url', ''),
     ]
     
-    for key, value in default_settings:
-        existing = Settings.query.filter_by(key=key).first()
-        if not existing:
-            setting = Settings(key=key, value=value)
-            db.session.add(setting)
-    
+    # One INSERT for all keys; rows that already exist are left untouched
+    stmt = _dialect_insert()(Settings).values([
+        {'key': key, 'value': value, 'updated_at': datetime.datetime.now()}
+        for key, value in default_settings
+    ])
+    db.session.execute(stmt.on_conflict_do_nothing(index_elements=['key']))
     db.session.commit()
+    invalidate_settings_cache()
+
+
+def invalidate_settings_cache():
+    """Force the next get_setting() call to reload from the database."""
+    _settings_cache['values'] = None
+
+
+def get_all_settings():
+    """Get all settings as a dict, served from the in-process cache."""
+    now = time.monotonic()
+    values = _settings_cache['values']
+    if values is None or now - _settings_cache['loaded_at'] > SETTINGS_CACHE_TTL:
+        values = dict(db.session.execute(db.select(Settings.key, Settings.value)).all())
+        _settings_cache['values'] = values
+        _settings_cache['loaded_at'] = now
+    return values
 
 
 def get_setting(key, default=None):
     """Get a setting value by key."""
-    setting = Settings.query.filter_by(key=key).first()
-    return setting.value if setting else default
+    return get_all_settings().get(key, default)
+
+
+def get_settings_bulk(defaults):
+    """Get several settings at once from one cache snapshot.
+
+    defaults maps each key to the value used when it is missing, so all
+    values in a request come from the same refresh of the cache.
+    """
+    values = get_all_settings()
+    return {key: values.get(key, default) for key, default in defaults.items()}
 
 
 def update_setting(key, value):
     """Update a setting value."""
-    setting = Settings.query.filter_by(key=key).first()
-    if setting:
-        setting.value = value
-        setting.updated_at = datetime.datetime.now()
-    else:
-        setting = Settings(key=key, value=value)
-        db.session.add(setting)
-    
-    db.session.commit()
\ No newline at end of file
+    update_settings_many({key: value})
+
+
+def update_settings_many(values):
+    """Upsert several settings with one multi-row INSERT and commit once."""
+    if not values:
+        return
+
+    now = datetime.datetime.now()
+    stmt = _dialect_insert()(Settings).values([
+        {'key': key, 'value': value, 'updated_at': now}
+        for key, value in values.items()
+    ])
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['key'],
+        set_={'value': stmt.excluded.value, 'updated_at': stmt.excluded.updated_at}
+    ))
+    db.session.commit()
+
+    # Write through so this worker sees the new values immediately
+    if _settings_cache['values'] is not None:
+        _settings_cache['values'] = {**_settings_cache['values'], **values}
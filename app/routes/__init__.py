@@ -1,12 +1,119 @@
 """Routes package."""
 
-from flask import Blueprint, redirect, url_for, send_file, current_app, abort
-from pathlib import Path
+from flask import Blueprint, Response, redirect, url_for, send_file, current_app, abort
+from urllib.parse import quote
+from datetime import datetime
+from functools import lru_cache
+from sqlalchemy import text
 import mimetypes
+import os
+import time
+from app import db
+from app.startup import migration_status
 
 # Main routes
 main_bp = Blueprint('main', __name__)
 
+# MIME types for every extension we accept, so the hot path is one dict lookup
+_EXT_MIME = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.bmp': 'image/bmp',
+    '.webp': 'image/webp',
+    '.mp4': 'video/mp4',
+    '.mov': 'video/quicktime',
+    '.avi': 'video/x-msvideo',
+    '.mkv': 'video/x-matroska',
+    '.webm': 'video/webm',
+    '.mp3': 'audio/mpeg',
+    '.flac': 'audio/flac',
+    '.m4a': 'audio/mp4',
+    '.ogg': 'audio/ogg',
+    '.wav': 'audio/wav',
+    '.aac': 'audio/aac',
+}
+
+
+def _guess_mimetype(filename, default):
+    """Look up the MIME type by extension, falling back to mimetypes then default."""
+    return _EXT_MIME.get(os.path.splitext(filename)[1].lower()) or mimetypes.guess_type(filename)[0] or default
+
+
+def _media_path(subfolder, filename):
+    """Join filename onto a precomputed media folder, rejecting path traversal."""
+    if os.sep in filename or (os.altsep and os.altsep in filename) or filename.startswith('.'):
+        abort(404)
+    return os.path.join(current_app.extensions['media_dirs'][subfolder], filename)
+
+
+def _media_response(file_path, subfolder, filename, mimetype, immutable=True):
+    """Send a media file, or hand it to nginx via X-Accel-Redirect when configured.
+
+    Uploaded filenames are unique and never rewritten, so those responses
+    are cached as immutable; repeat slideshow loads become cache hits or
+    304s. Pass immutable=False for files that can be replaced under the same
+    name (copied music): they get a short max-age and are revalidated.
+    """
+    if immutable:
+        max_age = current_app.config['MEDIA_CACHE_MAX_AGE']
+    else:
+        max_age = current_app.config['MUSIC_CACHE_MAX_AGE']
+    accel_prefix = current_app.config.get('MEDIA_ACCEL_REDIRECT_PREFIX')
+    if accel_prefix:
+        # Empty body; nginx streams the file itself (sendfile + range requests)
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{subfolder}/{quote(filename)}"
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        if immutable:
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.must_revalidate = True
+        return response
+
+    # conditional=True gives ETag/Last-Modified 304s and range requests for streaming
+    response = send_file(
+        file_path,
+        mimetype=mimetype,
+        as_attachment=False,
+        conditional=True,
+        max_age=max_age
+    )
+    if immutable:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.must_revalidate = True
+    return response
+
+
+# Seconds between real database probes; monitors polling faster get the cached result
+HEALTH_PROBE_INTERVAL = 5
+
+
+@lru_cache(maxsize=1)
+def _probe_database(window):
+    """Run SELECT 1 once per probe window (failures are not cached)."""
+    return db.session.execute(text('SELECT 1')).scalar()
+
+
+@main_bp.route('/health')
+def health_check():
+    """Health check endpoint for container monitoring."""
+    try:
+        # Test database connection on the session's pooled connection
+        _probe_database(int(time.time()) // HEALTH_PROBE_INTERVAL)
+        return {
+            'status': 'healthy',
+            'migration': migration_status,
+            'pool': db.engine.pool.status(),
+            'timestamp': datetime.utcnow().isoformat()
+        }, 200
+    except Exception as e:
+        return {'status': 'unhealthy', 'migration': migration_status, 'error': str(e)}, 503
+
+
 @main_bp.route('/')
 def index():
     """Redirect to login page."""
@@ -16,26 +123,16 @@ def index():
 @main_bp.route('/media/music/<filename>')
 def serve_music_file(filename):
     """Serve music files from the copied music folder."""
+    file_path = _media_path('music', filename)
     try:
-        music_folder = Path(current_app.config['MUSIC_COPY_FOLDER'])
-        file_path = music_folder / filename
-        
-        if not file_path.exists():
-            current_app.logger.error(f"Music file not found: {file_path}")
-            abort(404)
-        
-        # Set proper MIME type for audio streaming
-        mimetype, _ = mimetypes.guess_type(str(file_path))
-        if mimetype is None:
-            mimetype = 'audio/mpeg'  # Default to MP3
-            
-        return send_file(
-            file_path,
-            mimetype=mimetype,
-            as_attachment=False,
-            conditional=True  # Enable range requests for streaming
-        )
-        
+        # Default to MP3
+        mimetype = _guess_mimetype(filename, 'audio/mpeg')
+        # Named after title/artist, so a repeated download can replace it
+        return _media_response(file_path, 'music', filename, mimetype, immutable=False)
+
+    except FileNotFoundError:
+        current_app.logger.error(f"Music file not found: {file_path}")
+        abort(404)
     except Exception as e:
         # Don't catch HTTP exceptions (like 404)
         if hasattr(e, 'code'):
@@ -47,31 +144,15 @@ def serve_music_file(filename):
 @main_bp.route('/media/thumbnails/<filename>')
 def serve_thumbnail_file(filename):
     """Serve thumbnail files from the thumbnails folder."""
+    file_path = _media_path('thumbnails', filename)
     try:
-        thumbnail_folder = Path(current_app.config['UPLOAD_FOLDER']).parent / 'thumbnails'
-        file_path = thumbnail_folder / filename
-
-        if not file_path.exists():
-            current_app.logger.error(f"Thumbnail file not found: {file_path}")
-            abort(404)
-
-        # Set proper MIME type for thumbnails (always images)
-        mimetype, _ = mimetypes.guess_type(str(file_path))
-        if mimetype is None:
-            ext = file_path.suffix.lower()
-            if ext in ['.jpg', '.jpeg']:
-                mimetype = 'image/jpeg'
-            elif ext in ['.png']:
-                mimetype = 'image/png'
-            else:
-                mimetype = 'image/jpeg'  # Default for thumbnails
-
-        return send_file(
-            file_path,
-            mimetype=mimetype,
-            as_attachment=False
-        )
+        # Thumbnails are always images
+        mimetype = _guess_mimetype(filename, 'image/jpeg')
+        return _media_response(file_path, 'thumbnails', filename, mimetype)
 
+    except FileNotFoundError:
+        current_app.logger.error(f"Thumbnail file not found: {file_path}")
+        abort(404)
     except Exception as e:
         if hasattr(e, 'code'):
             raise e
@@ -82,54 +163,17 @@ def serve_thumbnail_file(filename):
 @main_bp.route('/media/photos/<filename>')
 def serve_media_file(filename):
     """Serve photo and video files from the uploads folder."""
+    file_path = _media_path('photos', filename)
     try:
-        upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
-        file_path = upload_folder / filename
-
-        if not file_path.exists():
-            current_app.logger.error(f"Media file not found: {file_path}")
-            abort(404)
-
-        # Set proper MIME type for images and videos
-        mimetype, _ = mimetypes.guess_type(str(file_path))
-
-        # Set default MIME types based on file extension
-        if mimetype is None:
-            ext = file_path.suffix.lower()
-            if ext in ['.jpg', '.jpeg']:
-                mimetype = 'image/jpeg'
-            elif ext in ['.png']:
-                mimetype = 'image/png'
-            elif ext in ['.gif']:
-                mimetype = 'image/gif'
-            elif ext in ['.webp']:
-                mimetype = 'image/webp'
-            elif ext in ['.mp4']:
-                mimetype = 'video/mp4'
-            elif ext in ['.mov']:
-                mimetype = 'video/quicktime'
-            elif ext in ['.avi']:
-                mimetype = 'video/x-msvideo'
-            elif ext in ['.mkv']:
-                mimetype = 'video/x-matroska'
-            elif ext in ['.webm']:
-                mimetype = 'video/webm'
-            else:
-                mimetype = 'application/octet-stream'
-
-        # Enable range requests for video streaming
-        is_video = mimetype.startswith('video/')
-
-        return send_file(
-            file_path,
-            mimetype=mimetype,
-            as_attachment=False,
-            conditional=is_video  # Enable range requests for videos
-        )
+        mimetype = _guess_mimetype(filename, 'application/octet-stream')
+        return _media_response(file_path, 'photos', filename, mimetype)
 
+    except FileNotFoundError:
+        current_app.logger.error(f"Media file not found: {file_path}")
+        abort(404)
     except Exception as e:
         # Don't catch HTTP exceptions (like 404)
         if hasattr(e, 'code'):
             raise e
         current_app.logger.error(f"Error serving media file {filename}: {e}")
-        abort(500)
\ No newline at end of file
+        abort(500)
@@ -1,38 +1,43 @@
 """Admin panel routes."""
 
-import subprocess
 import threading
-import time
 import datetime
-from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, Response
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, render_template, stream_template, request, flash, redirect, url_for, jsonify, Response, current_app
+from sqlalchemy import select
 from app import db
-from app.models import Photo, MusicQueue, Guest, Settings, update_setting, MusicLibrary
-from utils.music_library import music_search
+from app.models import Photo, MusicQueue, Guest, update_settings_many, get_all_settings, get_party_counts, MusicLibrary
+from utils.music_library import music_search, get_recent_library_stats, invalidate_library_stats
 from app.services.auth import admin_required
 from app.services.file_handler import file_handler
 
 admin_bp = Blueprint('admin', __name__)
 
 
+# Only the columns the dashboard's recent photos list shows (guest_name is denormalized)
+_RECENT_PHOTOS_STMT = (
+    select(Photo.guest_name, Photo.uploaded_at, Photo.wish_message)
+    .order_by(Photo.uploaded_at.desc())
+    .limit(10)
+)
+
+
 @admin_bp.route('/')
 @admin_required
 def dashboard():
     """Admin dashboard."""
-    stats = {
-        'total_photos': Photo.query.count(),
-        'total_guests': Guest.query.count(),
-        'music_requests': MusicQueue.query.count(),
-        'pending_photos': Photo.query.filter_by(displayed_at=None).count()
-    }
+    # All four counts in a single round-trip
+    stats = get_party_counts()
     
-    recent_photos = Photo.query.order_by(Photo.uploaded_at.desc()).limit(10).all()
+    recent_photos = db.session.execute(_RECENT_PHOTOS_STMT).all()
     
     return render_template('admin/dashboard.html', stats=stats, recent_photos=recent_photos)
 
 
 
 
-# Global variable to track indexing status
+# Global variable to track indexing status.
+# Mutate only while holding indexing_status_lock; read through _indexing_snapshot().
 indexing_status = {
     'running': False,
     'progress': 0,
@@ -40,6 +45,84 @@ indexing_status = {
     'current_file': '',
     'stats': {'indexed': 0, 'errors': 0, 'updated': 0}
 }
+indexing_status_lock = threading.Lock()
+
+# Notified (under indexing_status_lock) on every change, for /music/stream listeners
+indexing_status_changed = threading.Condition(indexing_status_lock)
+_indexing_version = 0
+
+# Seconds between SSE keepalive comments when nothing changes
+INDEXING_STREAM_KEEPALIVE = 15
+
+# Read-only columns for the dashboard's recent tracks list (no ORM objects needed)
+_RECENT_TRACKS_STMT = (
+    select(MusicLibrary.title, MusicLibrary.artist, MusicLibrary.album,
+           MusicLibrary.duration, MusicLibrary.indexed_at)
+    .order_by(MusicLibrary.indexed_at.desc())
+    .limit(10)
+)
+
+# Single worker: at most one indexing run at a time, no interpreter start-up
+_indexing_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='MusicIndexer')
+_indexing_future = None
+
+
+def _notify_indexing_status():
+    """Bump the status version and wake stream listeners; caller holds the lock."""
+    global _indexing_version
+    _indexing_version += 1
+    indexing_status_changed.notify_all()
+
+
+def _indexing_snapshot():
+    """Copy indexing_status under the lock so readers never see a half-applied update."""
+    with indexing_status_lock:
+        return {**indexing_status, 'stats': dict(indexing_status['stats'])}
+
+
+def _on_indexing_progress(event):
+    """Apply one progress event from the in-process indexer to indexing_status."""
+    with indexing_status_lock:
+        if event['event'] == 'total':
+            indexing_status['total'] = event['total']
+        elif event['event'] == 'file':
+            indexing_status['current_file'] = event['current_file']
+            indexing_status['progress'] = event['progress']
+        elif event['event'] == 'done':
+            stats = event['stats']
+            indexing_status['stats'] = {
+                'indexed': stats['indexed'],
+                'errors': stats['errors'],
+                'updated': stats['updated']
+            }
+        _notify_indexing_status()
+
+
+def _run_indexing_job(app, force):
+    """Run the music indexer on the executor thread and record the outcome."""
+    from utils.index_music import run_index
+
+    current_file = 'Completed'
+    try:
+        run_index(app, force=force, on_progress=_on_indexing_progress)
+    except Exception as e:
+        current_file = f'Error: {str(e)}'
+        app.logger.error(f"Music indexing failed: {e}")
+    finally:
+        # Before reporting completion, so the dashboard reload shows new stats
+        invalidate_library_stats()
+        with indexing_status_lock:
+            indexing_status.update(running=False, current_file=current_file)
+            _notify_indexing_status()
+
+
+def _indexing_job_state():
+    """Describe the executor job backing the latest indexing run."""
+    if _indexing_future is None:
+        return 'none'
+    if _indexing_future.running():
+        return 'running'
+    return 'done' if _indexing_future.done() else 'queued'
 
 
 @admin_bp.route('/music')
@@ -47,107 +130,50 @@ indexing_status = {
 def music_dashboard():
     """Music library management dashboard."""
     # Get library statistics
-    stats = music_search.get_library_stats()
+    stats = get_recent_library_stats()
     
     # Get recent tracks
-    recent_tracks = MusicLibrary.query.order_by(MusicLibrary.indexed_at.desc()).limit(10).all()
+    recent_tracks = db.session.execute(_RECENT_TRACKS_STMT).mappings().all()
     
     # Format tracks for display
     formatted_tracks = []
     for track in recent_tracks:
         duration_str = "0:00"
-        if track.duration:
-            minutes = track.duration // 60
-            seconds = track.duration % 60
+        if track['duration']:
+            minutes = track['duration'] // 60
+            seconds = track['duration'] % 60
             duration_str = f"{minutes}:{seconds:02d}"
         
         formatted_tracks.append({
-            'title': track.title or 'Unknown Title',
-            'artist': track.artist or 'Unknown Artist',
-            'album': track.album or '',
+            'title': track['title'] or 'Unknown Title',
+            'artist': track['artist'] or 'Unknown Artist',
+            'album': track['album'] or '',
             'duration_formatted': duration_str,
-            'indexed_at': track.indexed_at
+            'indexed_at': track['indexed_at']
         })
     
     return render_template('admin/music.html', 
                          stats=stats, 
                          recent_tracks=formatted_tracks,
-                         indexing_status=indexing_status)
+                         indexing_status=_indexing_snapshot())
 
 
 @admin_bp.route('/music/start-index', methods=['POST'])
 def start_music_indexing():
     """Start music library indexing."""
-    global indexing_status
+    global _indexing_future
     
-    if indexing_status['running']:
-        return jsonify({'error': 'Indexing already in progress'}), 400
+    # Check and claim the run atomically so two clicks can't start two indexers
+    with indexing_status_lock:
+        if indexing_status['running']:
+            return jsonify({'error': 'Indexing already in progress'}), 400
+        indexing_status.update(running=True, progress=0, current_file='Starting...')
+        _notify_indexing_status()
     
     force = request.json.get('force', False) if request.is_json else request.form.get('force') == 'true'
     
-    # Start indexing in background thread
-    def run_indexing():
-        global indexing_status
-        try:
-            indexing_status['running'] = True
-            indexing_status['progress'] = 0
-            indexing_status['current_file'] = 'Starting...'
-            
-            # Run the indexing script
-            cmd = ['python', 'index_music.py']
-            if force:
-                cmd.append('--force')
-            cmd.append('--verbose')
-            
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1
-            )
-            
-            # Parse output for progress
-            for line in process.stdout:
-                line = line.strip()
-                if 'Found' in line and 'audio files' in line:
-                    # Extract total files count
-                    parts = line.split()
-                    for i, part in enumerate(parts):
-                        if part.isdigit():
-                            indexing_status['total'] = int(part)
-                            break
-                elif 'Processing' in line:
-                    # Extract current file being processed
-                    if 'Processing' in line:
-                        filename = line.split('Processing ')[-1].split(']')[0]
-                        indexing_status['current_file'] = filename
-                elif 'New files indexed:' in line:
-                    # Extract stats
-                    parts = line.split(':')
-                    if len(parts) > 1:
-                        indexing_status['stats']['indexed'] = int(parts[1].strip())
-                elif 'Files updated:' in line:
-                    parts = line.split(':')
-                    if len(parts) > 1:
-                        indexing_status['stats']['updated'] = int(parts[1].strip())
-                elif 'Errors:' in line:
-                    parts = line.split(':')
-                    if len(parts) > 1:
-                        indexing_status['stats']['errors'] = int(parts[1].strip())
-            
-            process.wait()
-            
-        except Exception as e:
-            indexing_status['current_file'] = f'Error: {str(e)}'
-        finally:
-            indexing_status['running'] = False
-            indexing_status['current_file'] = 'Completed'
-    
-    # Start thread
-    thread = threading.Thread(target=run_indexing)
-    thread.daemon = True
-    thread.start()
+    # Run the indexer in-process; it shares the app's pooled connections
+    _indexing_future = _indexing_executor.submit(_run_indexing_job, current_app._get_current_object(), force)
     
     flash('Music indexing started!', 'success')
     return redirect(url_for('admin.music_dashboard'))
@@ -155,8 +181,56 @@ def start_music_indexing():
 
 @admin_bp.route('/music/status')
 def music_indexing_status():
-    """Get current indexing status."""
-    return jsonify(indexing_status)
+    """Get current indexing status, answering 304 when nothing changed."""
+    with indexing_status_lock:
+        version = _indexing_version
+    job = _indexing_job_state()
+
+    # The version counter changes on every status update, so it is a free ETag
+    etag = f'{version}-{job}'
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        status = _indexing_snapshot()
+        status['job'] = job
+        response = jsonify(status)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+
+@admin_bp.route('/music/stream')
+def music_indexing_stream():
+    """Push indexing status as server-sent events until the run finishes."""
+    dumps = current_app.json.dumps
+
+    def generate():
+        last_version = None
+        while True:
+            with indexing_status_changed:
+                changed = indexing_status_changed.wait_for(
+                    lambda: _indexing_version != last_version,
+                    timeout=INDEXING_STREAM_KEEPALIVE
+                )
+                if not changed:
+                    status = None
+                else:
+                    last_version = _indexing_version
+                    status = {**indexing_status, 'stats': dict(indexing_status['stats'])}
+
+            if status is None:
+                # Comment line keeps proxies from closing an idle stream
+                yield ': keepalive\n\n'
+                continue
+
+            yield f"data: {dumps(status)}\n\n"
+            if not status['running']:
+                return
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx must not buffer the stream
+    return response
 
 
 @admin_bp.route('/music/search-test', methods=['POST'])
@@ -181,9 +255,11 @@ def search_test():
 def clear_music_index():
     """Clear the music library index."""
     try:
-        # Delete all music library records
-        MusicLibrary.query.delete()
+        # Delete all music library records in one statement; nothing in the
+        # session needs syncing, so skip the ORM's per-object bookkeeping
+        db.session.execute(db.delete(MusicLibrary).execution_options(synchronize_session=False))
         db.session.commit()
+        invalidate_library_stats()
         
         flash('Music library index cleared successfully!', 'success')
     except Exception as e:
@@ -192,59 +268,86 @@ def clear_music_index():
     return redirect(url_for('admin.music_dashboard'))
 
 
+# Window around a photo's upload in which a guest's song counts as its music
+MUSIC_MATCH_WINDOW = datetime.timedelta(minutes=5)
+
+
+def _match_photo_music(photos):
+    """Map photo id -> associated MusicQueue entry using a single query.
+
+    A direct photo_id link wins. Otherwise (older submissions) the same
+    guest's song closest in time within MUSIC_MATCH_WINDOW is used, and each
+    fallback song is matched to at most one photo. Photos are matched in the
+    order given.
+    """
+    from bisect import bisect_left
+
+    songs = MusicQueue.query.filter(MusicQueue.status.in_(['ready', 'completed']))\
+        .order_by(MusicQueue.id).all()
+
+    linked = {}
+    by_guest = {}
+    for song in songs:
+        if song.photo_id is not None:
+            linked.setdefault(song.photo_id, song)
+        if song.guest_id is not None and song.submitted_at is not None:
+            by_guest.setdefault(song.guest_id, []).append(song)
+
+    # Per-guest lists sorted by time so each window is found with a bisect
+    guest_times = {}
+    for guest_id, guest_songs in by_guest.items():
+        guest_songs.sort(key=lambda song: song.submitted_at)
+        guest_times[guest_id] = [song.submitted_at for song in guest_songs]
+
+    used_music_ids = set()
+    matches = {}
+    for photo in photos:
+        music = linked.get(photo.id)
+
+        if not music and photo.guest_id in by_guest and photo.uploaded_at:
+            guest_songs = by_guest[photo.guest_id]
+            window_end = photo.uploaded_at + MUSIC_MATCH_WINDOW
+            min_diff = None
+            i = bisect_left(guest_times[photo.guest_id], photo.uploaded_at - MUSIC_MATCH_WINDOW)
+            while i < len(guest_songs) and guest_songs[i].submitted_at <= window_end:
+                candidate = guest_songs[i]
+                i += 1
+                if candidate.id in used_music_ids:
+                    continue
+                time_diff = abs((candidate.submitted_at - photo.uploaded_at).total_seconds())
+                if min_diff is None or time_diff < min_diff:
+                    min_diff = time_diff
+                    music = candidate
+
+            if music:
+                used_music_ids.add(music.id)
+
+        if music:
+            matches[photo.id] = music
+
+    return matches
+
+
 @admin_bp.route('/export')
 def memory_book():
     """Display the memory book with all photos, wishes, and music."""
+    import os
+
+    photos_dir = current_app.extensions['media_dirs']['photos']
+
     # Get all photos with their associated music
     photos = Photo.query.order_by(Photo.uploaded_at.asc()).all()
 
-    # Track which music has been used (for fallback matching only)
-    used_music_ids = set()
+    # Match music for every photo from one query instead of one or two per photo
+    music_by_photo = _match_photo_music(photos)
 
     # For each photo, find the associated music
     memories = []
     for photo in photos:
-        music = None
-
-        # FIRST: Try direct photo_id link (new association method)
-        music = MusicQueue.query.filter_by(photo_id=photo.id)\
-            .filter(MusicQueue.status.in_(['ready', 'completed']))\
-            .first()
-
-        # FALLBACK: If no direct link, try guest-based matching (backward compatibility)
-        if not music and photo.guest_id:
-            # Find music from same guest submitted around the same time (within 5 minutes)
-            # Exclude music that's already been matched to avoid duplicates
-            from datetime import timedelta
-            from sqlalchemy import func
-            time_window_start = photo.uploaded_at - timedelta(minutes=5)
-            time_window_end = photo.uploaded_at + timedelta(minutes=5)
-
-            # Find all candidate music in time window, excluding already used ones
-            candidates = MusicQueue.query.filter_by(guest_id=photo.guest_id)\
-                .filter(MusicQueue.status.in_(['ready', 'completed']))\
-                .filter(MusicQueue.submitted_at >= time_window_start)\
-                .filter(MusicQueue.submitted_at <= time_window_end)\
-                .filter(~MusicQueue.id.in_(used_music_ids) if used_music_ids else True)\
-                .all()
-
-            # Find the closest music by time
-            if candidates:
-                from datetime import datetime
-                best_match = None
-                min_diff = None
-                for candidate in candidates:
-                    time_diff = abs((candidate.submitted_at - photo.uploaded_at).total_seconds())
-                    if min_diff is None or time_diff < min_diff:
-                        min_diff = time_diff
-                        best_match = candidate
-
-                if best_match:
-                    music = best_match
-                    used_music_ids.add(music.id)
+        music = music_by_photo.get(photo.id)
 
         # Get creation date from photo metadata
-        photo_path = f'media/photos/{photo.filename}'
+        photo_path = os.path.join(photos_dir, photo.filename or '')
         creation_date = file_handler.get_media_creation_date(photo_path)
 
         memories.append({
@@ -256,21 +359,52 @@ def memory_book():
     return render_template('admin/memory_book.html', memories=memories)
 
 
+# Rows per page in the manage page's photo and music tables
+MANAGE_PAGE_SIZE = 50
+
+_MANAGE_PHOTOS_STMT = select(
+    Photo.id, Photo.guest_name, Photo.wish_message, Photo.uploaded_at,
+    Photo.filename, Photo.file_type, Photo.thumbnail,
+).order_by(Photo.uploaded_at.desc())
+
+_MANAGE_MUSIC_STMT = select(
+    MusicQueue.id, MusicQueue.song_title, MusicQueue.artist, MusicQueue.guest_id,
+    Guest.name.label('guest_name'), MusicQueue.source, MusicQueue.status,
+    MusicQueue.submitted_at, MusicQueue.filename,
+).outerjoin(Guest, Guest.id == MusicQueue.guest_id).order_by(MusicQueue.submitted_at.desc())
+
+
+def _clamp_page(page, total):
+    """Keep a 1-based page number within the pages that exist."""
+    last_page = max((total + MANAGE_PAGE_SIZE - 1) // MANAGE_PAGE_SIZE, 1)
+    return min(max(page, 1), last_page)
+
+
 @admin_bp.route('/manage')
 @admin_required
 def manage():
     """Admin management page to view and delete entries."""
-    # Get all photos with guest info
-    photos = Photo.query.order_by(Photo.uploaded_at.desc()).all()
+    counts = get_party_counts()
 
-    # Get all music queue entries with guest info
-    music_entries = MusicQueue.query.order_by(MusicQueue.submitted_at.desc()).all()
+    # Clamp to the last page so stale links after deletes still show rows
+    photo_page = _clamp_page(request.args.get('photo_page', 1, type=int), counts['total_photos'])
+    music_page = _clamp_page(request.args.get('music_page', 1, type=int), counts['music_requests'])
+
+    # One page of each table, only the columns the tables show
+    photos = db.session.execute(
+        _MANAGE_PHOTOS_STMT.limit(MANAGE_PAGE_SIZE).offset((photo_page - 1) * MANAGE_PAGE_SIZE)
+    ).all()
+    music_entries = db.session.execute(
+        _MANAGE_MUSIC_STMT.limit(MANAGE_PAGE_SIZE).offset((music_page - 1) * MANAGE_PAGE_SIZE)
+    ).all()
 
     # Get all settings for the form
-    all_settings = Settings.query.all()
-    settings_dict = {s.key: s.value for s in all_settings}
+    settings_dict = get_all_settings()
 
-    return render_template('admin/manage.html', photos=photos, music_entries=music_entries, settings=settings_dict)
+    return render_template('admin/manage.html', photos=photos, music_entries=music_entries,
+                           total_photos=counts['total_photos'], total_music=counts['music_requests'],
+                           photo_page=photo_page, music_page=music_page,
+                           page_size=MANAGE_PAGE_SIZE, settings=settings_dict)
 
 
 @admin_bp.route('/manage/update_settings', methods=['POST'])
@@ -285,32 +419,48 @@ def update_settings():
         'guest_password', 'admin_password', 'external_url'
     ]
 
-    for key in settings_to_update:
-        value = request.form.get(key)
-        if value is not None:
-            update_setting(key, value)
+    # Save every submitted field in a single upsert
+    update_settings_many({
+        key: request.form[key] for key in settings_to_update if key in request.form
+    })
 
     flash('Settings updated successfully!', 'success')
     return redirect(url_for('admin.manage'))
 
 
+# Unlinks run off the request thread; slow (e.g. network) media mounts don't block the admin
+_file_cleanup_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='MediaCleanup')
+
+
+def _remove_media_file(path, logger):
+    """Delete a media file, ignoring files that are already gone."""
+    import os
+
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"Error removing media file {path}: {e}")
+
+
 @admin_bp.route('/manage/delete_photo/<int:photo_id>', methods=['POST'])
 def delete_photo(photo_id):
     """Delete a photo entry."""
     import os
     
-    photo = Photo.query.get_or_404(photo_id)
+    photo = db.get_or_404(Photo, photo_id)
     
     try:
-        # Delete the physical file
-        photo_path = f'media/photos/{photo.filename}'
-        if os.path.exists(photo_path):
-            os.remove(photo_path)
+        photo_path = os.path.join(current_app.extensions['media_dirs']['photos'], photo.filename or '')
         
         # Delete from database
         db.session.delete(photo)
         db.session.commit()
         
+        # Delete the physical file once the row is gone
+        _file_cleanup_executor.submit(_remove_media_file, photo_path, current_app.logger)
+        
         flash('Photo deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting photo: {str(e)}', 'error')
@@ -323,19 +473,21 @@ def delete_music(music_id):
     """Delete a music entry."""
     import os
     
-    music = MusicQueue.query.get_or_404(music_id)
+    music = db.get_or_404(MusicQueue, music_id)
     
     try:
-        # Delete the physical file if it exists
+        music_path = None
         if music.filename:
-            music_path = f'media/music/{music.filename}'
-            if os.path.exists(music_path):
-                os.remove(music_path)
+            music_path = os.path.join(current_app.extensions['media_dirs']['music'], music.filename)
         
         # Delete from database
         db.session.delete(music)
         db.session.commit()
         
+        # Delete the physical file if it exists, once the row is gone
+        if music_path:
+            _file_cleanup_executor.submit(_remove_media_file, music_path, current_app.logger)
+        
         flash('Music entry deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting music: {str(e)}', 'error')
@@ -347,10 +499,9 @@ def delete_music(music_id):
 @admin_required
 def retry_music_download(music_id):
     """Retry downloading a failed YouTube song."""
-    import threading
     from flask import current_app
 
-    music = MusicQueue.query.get_or_404(music_id)
+    music = db.get_or_404(MusicQueue, music_id)
 
     if music.source != 'youtube':
         flash(f'Can only retry YouTube downloads. This is a {music.source} song.', 'error')
@@ -394,23 +545,16 @@ def retry_music_download(music_id):
                 print(f"✅ RETRY: Found video: {video_url}")
                 current_app.logger.info(f"✅ RETRY: Found video: {video_url}")
 
-                # Now start the download thread
-                from app.routes.mobile import download_youtube_async
+                # Now queue the download on the shared download pool
+                from app.routes.mobile import start_youtube_download
 
-                print(f"🚀 RETRY: Starting download thread for ID {music_id}")
-                current_app.logger.info(f"🚀 RETRY: Starting download thread for ID {music_id}")
+                print(f"🚀 RETRY: Queueing download for ID {music_id}")
+                current_app.logger.info(f"🚀 RETRY: Queueing download for ID {music_id}")
 
-                # Start download in background thread
-                retry_thread = threading.Thread(
-                    target=download_youtube_async,
-                    args=(video_url, title, artist, current_app._get_current_object(), music_id),
-                    name=f"YouTubeRetry-{music_id}"
-                )
-                retry_thread.daemon = True
-                retry_thread.start()
+                start_youtube_download(video_url, title, artist, current_app._get_current_object(), music_id)
 
-                print(f"✅ RETRY: Thread started successfully for ID {music_id}")
-                current_app.logger.info(f"✅ RETRY: Thread started successfully for ID {music_id}")
+                print(f"✅ RETRY: Download queued successfully for ID {music_id}")
+                current_app.logger.info(f"✅ RETRY: Download queued successfully for ID {music_id}")
 
             else:
                 print(f"❌ RETRY: No YouTube results found for: {search_query}")
@@ -433,6 +577,38 @@ def retry_music_download(music_id):
     return redirect(url_for('admin.manage'))
 
 
+# Parallel file copies when exporting the standalone memory book
+EXPORT_COPY_WORKERS = 8
+
+
+def _export_copy(src, dest):
+    """Copy one media file into the export; return False if the source is missing.
+
+    A hard link is tried first so same-filesystem exports move no file data;
+    otherwise shutil.copy2 (os.sendfile on Linux). Both keep the mtime, so
+    an unchanged size + mtime means an earlier export already has the file.
+    """
+    import os
+    import shutil
+
+    try:
+        src_stat = os.stat(src)
+    except FileNotFoundError:
+        return False
+    try:
+        dest_stat = os.stat(dest)
+        if src_stat.st_size == dest_stat.st_size and int(src_stat.st_mtime) == int(dest_stat.st_mtime):
+            return True
+    except FileNotFoundError:
+        try:
+            os.link(src, dest)
+            return True
+        except OSError:
+            pass  # Cross-device, unsupported (FAT/exFAT USB) or not permitted
+    shutil.copy2(src, dest)
+    return True
+
+
 @admin_bp.route('/export/standalone')
 def export_standalone():
     """Export standalone HTML memory book for USB."""
@@ -443,86 +619,40 @@ def export_standalone():
     # Get all photos with their associated music
     photos = Photo.query.order_by(Photo.uploaded_at.asc()).all()
     
-    # Create export directory
+    # Source folders resolved at startup; export subfolders mirror them
+    media_dirs = current_app.extensions['media_dirs']
     export_dir = 'export'
-    os.makedirs(export_dir, exist_ok=True)
-    os.makedirs(f'{export_dir}/photos', exist_ok=True)
-    os.makedirs(f'{export_dir}/thumbnails', exist_ok=True)
-    os.makedirs(f'{export_dir}/music', exist_ok=True)
+    export_dirs = {name: os.path.join(export_dir, name) for name in ('photos', 'thumbnails', 'music')}
+    for path in export_dirs.values():
+        os.makedirs(path, exist_ok=True)
     
-    # Track which music has been used (for fallback matching only)
-    used_music_ids = set()
+    # Match music for every photo from one query (same rules as memory_book())
+    music_by_photo = _match_photo_music(photos)
 
-    # Prepare memories data and copy files
+    # Prepare memories data and collect files to copy (dest -> src, so a song
+    # shared by several photos is copied once)
     memories = []
+    copies = {}
     for photo in photos:
         # Copy photo file
-        photo_src = f'media/photos/{photo.filename}'
-        photo_dest = f'{export_dir}/photos/{photo.filename}'
-        if os.path.exists(photo_src):
-            shutil.copy2(photo_src, photo_dest)
+        photo_src = os.path.join(media_dirs['photos'], photo.filename or '')
+        copies[os.path.join(export_dirs['photos'], photo.filename or '')] = photo_src
 
         # Copy video thumbnail if it exists
         if photo.file_type == 'video' and photo.thumbnail:
-            thumb_src = f'media/thumbnails/{photo.thumbnail}'
-            thumb_dest = f'{export_dir}/thumbnails/{photo.thumbnail}'
-            if os.path.exists(thumb_src):
-                shutil.copy2(thumb_src, thumb_dest)
+            copies[os.path.join(export_dirs['thumbnails'], photo.thumbnail)] = \
+                os.path.join(media_dirs['thumbnails'], photo.thumbnail)
 
         # Get associated music using same logic as memory_book()
-        music = None
-
-        # FIRST: Try direct photo_id link (new association method)
-        music = MusicQueue.query.filter_by(photo_id=photo.id)\
-            .filter(MusicQueue.status.in_(['ready', 'completed']))\
-            .first()
-
-        # FALLBACK: If no direct link, try guest-based matching (backward compatibility)
-        if not music and photo.guest_id:
-            # Find music from same guest submitted around the same time (within 5 minutes)
-            # Exclude music that's already been matched to avoid duplicates
-            from datetime import timedelta
-            time_window_start = photo.uploaded_at - timedelta(minutes=5)
-            time_window_end = photo.uploaded_at + timedelta(minutes=5)
-
-            # Find all candidate music in time window, excluding already used ones
-            candidates = MusicQueue.query.filter_by(guest_id=photo.guest_id)\
-                .filter(MusicQueue.status.in_(['ready', 'completed']))\
-                .filter(MusicQueue.submitted_at >= time_window_start)\
-                .filter(MusicQueue.submitted_at <= time_window_end)\
-                .filter(~MusicQueue.id.in_(used_music_ids) if used_music_ids else True)\
-                .all()
-
-            # Find the closest music by time
-            if candidates:
-                best_match = None
-                min_diff = None
-                for candidate in candidates:
-                    time_diff = abs((candidate.submitted_at - photo.uploaded_at).total_seconds())
-                    if min_diff is None or time_diff < min_diff:
-                        min_diff = time_diff
-                        best_match = candidate
-
-                if best_match:
-                    music = best_match
-                    used_music_ids.add(music.id)
+        music = music_by_photo.get(photo.id)
 
         # Copy music file if exists, but include music info even if file is missing
-        music_available = False
         if music and music.filename:
-            music_src = f'media/music/{music.filename}'
-            music_dest = f'{export_dir}/music/{music.filename}'
-            if os.path.exists(music_src):
-                shutil.copy2(music_src, music_dest)
-                music_available = True
-
-        # Add music availability info for template
-        if music:
-            music.file_available = music_available
+            copies[os.path.join(export_dirs['music'], music.filename)] = \
+                os.path.join(media_dirs['music'], music.filename)
 
         # Get creation date from photo metadata
-        photo_path = f'media/photos/{photo.filename}'
-        creation_date = file_handler.get_media_creation_date(photo_path)
+        creation_date = file_handler.get_media_creation_date(photo_src)
 
         memories.append({
             'photo': photo,
@@ -530,15 +660,25 @@ def export_standalone():
             'creation_date': creation_date or photo.uploaded_at
         })
     
-    # Generate standalone HTML
-    current_date = datetime.datetime.now()
-    html_content = render_template('admin/memory_book_standalone.html',
-                                 memories=memories,
-                                 current_date=current_date)
+    # Copy media concurrently; the copies are I/O-bound so threads overlap them.
+    # Missing sources are skipped by the copy itself rather than checked up front.
+    with ThreadPoolExecutor(max_workers=EXPORT_COPY_WORKERS, thread_name_prefix='ExportCopy') as pool:
+        futures = {dest: pool.submit(_export_copy, src, dest) for dest, src in copies.items()}
+        copied = {dest: future.result() for dest, future in futures.items()}
+    
+    # Add music availability info for template
+    for memory in memories:
+        music = memory['music']
+        if music:
+            music.file_available = bool(music.filename) and copied.get(os.path.join(export_dirs['music'], music.filename), False)
     
-    # Save standalone HTML file
+    # Generate standalone HTML, writing chunks as they render instead of
+    # building the whole page in memory first
+    current_date = datetime.datetime.now()
     with open(f'{export_dir}/index.html', 'w', encoding='utf-8') as f:
-        f.write(html_content)
+        f.writelines(stream_template('admin/memory_book_standalone.html',
+                                     memories=memories,
+                                     current_date=current_date))
     
     # Copy database backup
     if os.path.exists('party.db'):
@@ -550,47 +690,21 @@ def export_standalone():
 
 @admin_bp.route('/reset-party', methods=['POST'])
 def reset_party():
-    """Reset party data using the reset_party.py script."""
-    import os
-    import sys
+    """Reset party data in-process with the reset_party.py helpers."""
+    from utils.reset_party import reset
 
     try:
-        # Get the project root directory (where the script is located)
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        reset_script_path = os.path.join(project_root, 'utils', 'reset_party.py')
-
-        # Check if the reset script exists
-        if not os.path.exists(reset_script_path):
-            flash('Reset script not found!', 'error')
-            return redirect(url_for('admin.manage'))
-
-        # Set up the environment to include the project root in Python path
-        env = os.environ.copy()
-        pythonpath = env.get('PYTHONPATH', '')
-        if pythonpath:
-            env['PYTHONPATH'] = f"{project_root}:{pythonpath}"
+        results = reset(current_app._get_current_object())
+
+        errors = [result['error'] for group in results.values() for result in group.values()
+                  if result['status'] == 'error']
+        if errors:
+            flash(f"Reset failed: {'; '.join(errors)}", 'error')
         else:
-            env['PYTHONPATH'] = project_root
-
-        # Run the reset script with --no-confirm flag
-        result = subprocess.run(
-            [sys.executable, reset_script_path, '--no-confirm'],
-            cwd=project_root,
-            capture_output=True,
-            text=True,
-            timeout=60,  # 60 second timeout
-            env=env
-        )
-
-        if result.returncode == 0:
             flash('Party data reset successfully! 🎉', 'success')
-        else:
-            error_msg = result.stderr or result.stdout or 'Unknown error occurred'
-            flash(f'Reset failed: {error_msg}', 'error')
 
-    except subprocess.TimeoutExpired:
-        flash('Reset operation timed out. Please try again.', 'error')
     except Exception as e:
-        flash(f'Error running reset script: {str(e)}', 'error')
+        db.session.rollback()
+        flash(f'Error resetting party data: {str(e)}', 'error')
 
-    return redirect(url_for('admin.manage'))
\ No newline at end of file
+    return redirect(url_for('admin.manage'))
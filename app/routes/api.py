@@ -1,152 +1,249 @@
 """API routes for HTMX interactions."""
 
-from flask import Blueprint, render_template, jsonify, request, current_app
-from app.models import Photo, MusicQueue, get_setting
+from flask import Blueprint, Response, render_template, jsonify, request, current_app, make_response
+from app.models import Photo, MusicQueue, get_setting, get_recent_party_counts
 from app import db
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import joinedload, raiseload, undefer
+from app.services.photo_index import photo_signature, slideshow_photo_ids, load_photos
+from app.utils.slideshow import get_slideshow_timing, slideshow_position
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
+import hashlib
 from pathlib import Path
+import threading
+import time
 from app.utils.network_utils import get_network_ip, get_server_url
 
 api_bp = Blueprint('api', __name__)
 
-# Flag to track if welcome screen has been shown since app startup
-_first_load_welcome_shown = False
+# Seconds before the host IP is probed again (it can change if the party AP comes up late)
+NETWORK_IP_TTL = 60
 
+# Rendered big screen fragments by ETag (which covers the rows they show); only
+# the current and next slides and the current music queue matter
+RENDERED_FRAGMENT_CACHE_SIZE = 8
+_rendered_fragments = OrderedDict()
+_rendered_fragments_lock = threading.Lock()
 
-@api_bp.route('/current_photo')
-def current_photo():
-    """Get current photo for slideshow with cycling and periodic welcome screen."""
-    global _first_load_welcome_shown
-    import time
 
-    # On first load after startup, always show welcome screen first
-    if not _first_load_welcome_shown:
-        _first_load_welcome_shown = True
-        return render_template('components/welcome_screen.html')
+def _rows_tag(rows):
+    """Short digest of the rows' values, so editing a shown photo changes the ETag."""
+    return hashlib.md5(repr([tuple(row) for row in rows]).encode('utf-8')).hexdigest()[:16]
 
-    photos = Photo.query.order_by(Photo.uploaded_at.asc()).all()
 
-    if not photos:
-        return render_template('components/no_photos.html')
+def _conditional_fragment(key, rows, max_age, render, mimetype='text/html'):
+    """Serve an HTMX fragment with an ETag, answering 304 without rendering when unchanged.
+
+    key names the fragment kind and rows are the database rows it renders
+    (in order). The ETag, which is also the rendered-copy
+    cache key, is key plus a digest of rows, so an edited photo never
+    matches an older copy. Every screen polling the same tick shares one
+    rendered copy.
+
+    max_age is the time until the slideshow tick changes the fragment, so
+    clients (and any proxy) can reuse it until then.
+    """
+    etag = f'{key}-{_rows_tag(rows)}'
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        with _rendered_fragments_lock:
+            html = _rendered_fragments.get(etag)
+        if html is None:
+            html = render()
+            with _rendered_fragments_lock:
+                _rendered_fragments[etag] = html
+                if len(_rendered_fragments) > RENDERED_FRAGMENT_CACHE_SIZE:
+                    _rendered_fragments.popitem(last=False)
+        response = make_response(html)
+        response.mimetype = mimetype
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max(max_age, 0)
+    return response
+
+
+def _current_slide():
+    """Work out what the slideshow shows right now.
+
+    Returns (kind, photo_index, seconds_left, signature) where kind is
+    'welcome', 'empty' or 'photo'. seconds_left is None when the answer
+    must not be cached (the first-load welcome screen and the empty state).
+    """
+    # On first load after startup, always show welcome screen first. The flag
+    # lives on the app, so a fresh app (tests, reloader) starts over.
+    if not current_app.extensions.get('first_load_welcome_shown'):
+        current_app.extensions['first_load_welcome_shown'] = True
+        return 'welcome', None, None, None
+
+    # Cheap signature of the photo set; the photo rows are only read on a cache miss
+    signature = photo_signature()
+    photo_count = signature[0]
+
+    if not photo_count:
+        return 'empty', None, None, signature
 
     # Get welcome screen settings
-    interval_type = get_setting('welcome_screen_interval_type', 'photos')
-    interval_value = int(get_setting('welcome_screen_interval_value', '5'))
-    welcome_duration = int(get_setting('welcome_screen_duration', '8'))
-    slideshow_duration = int(get_setting('slideshow_duration', '8'))
+    timing = get_slideshow_timing()
+    slideshow_duration = timing.slideshow_duration
 
     current_time = int(time.time())
 
-    # Check if we should show welcome screen
-    should_show_welcome = False
+    should_show_welcome, photo_cycle = slideshow_position(current_time, timing)
+
+    # Seconds until the next slide (or, for time-based welcome screens, the
+    # next time the welcome screen appears or disappears)
+    seconds_left = slideshow_duration - current_time % slideshow_duration
+    if timing.interval_type == 'time':
+        seconds_in_minute = current_time % 60
+        if should_show_welcome:
+            seconds_left = min(seconds_left, timing.welcome_duration - seconds_in_minute)
+        else:
+            seconds_left = min(seconds_left, 60 - seconds_in_minute)
+
+    if should_show_welcome:
+        return 'welcome', None, seconds_left, signature
 
-    if interval_type == 'photos':
-        # Show welcome screen every N photos, inserted between photos
-        # Calculate which photo cycle we're in (ignoring welcome screens)
-        total_photo_cycles = current_time // slideshow_duration
+    # Regular photo cycling - welcome screen slots are not counted
+    return 'photo', photo_cycle % photo_count, seconds_left, signature
 
-        # Every (interval_value + 1) cycles, one cycle shows welcome screen
-        cycle_group = total_photo_cycles // (interval_value + 1)
-        position_in_group = total_photo_cycles % (interval_value + 1)
 
-        # Show welcome screen on the last position of each group
-        should_show_welcome = (position_in_group == interval_value)
+def _slide_photo(photo_index, signature):
+    """Read the row for the photo at photo_index, or None if it was just deleted."""
+    # The snapshot can be shorter than the index if photos were deleted
+    # after the signature was read
+    ids = slideshow_photo_ids(signature)
+    if photo_index >= len(ids):
+        return None
+    # Only the photo on screen is read in full
+    photos = load_photos([ids[photo_index]])
+    return photos[0] if photos else None
 
-    elif interval_type == 'time':
-        # Show welcome screen every N minutes
-        minutes_elapsed = current_time // 60
-        should_show_welcome = (minutes_elapsed % interval_value == 0) and ((current_time % 60) < (welcome_duration))
 
-    if should_show_welcome:
-        return render_template('components/welcome_screen.html')
-
-    # Regular photo cycling - calculate photo index excluding welcome screen cycles
-    if interval_type == 'photos':
-        # Count only photo cycles (not welcome screen cycles)
-        total_photo_cycles = current_time // slideshow_duration
-        cycle_group = total_photo_cycles // (interval_value + 1)
-        position_in_group = total_photo_cycles % (interval_value + 1)
-
-        # If we're showing photos (not welcome screen), calculate which photo
-        actual_photo_cycles = cycle_group * interval_value + position_in_group
-        photo_index = actual_photo_cycles % len(photos)
-    else:
-        # Simple cycling for time-based welcome screens
-        photo_index = (current_time // slideshow_duration) % len(photos)
+@api_bp.route('/current_photo')
+def current_photo():
+    """Get current photo for slideshow with cycling and periodic welcome screen."""
+    kind, photo_index, seconds_left, signature = _current_slide()
 
-    photo = photos[photo_index]
-    return render_template('components/photo_display.html', photo=photo)
+    if kind == 'empty':
+        return render_template('components/no_photos.html')
+
+    if kind == 'welcome':
+        if seconds_left is None:
+            return render_template('components/welcome_screen.html')
+        return _conditional_fragment('welcome', (), seconds_left,
+                                     lambda: render_template('components/welcome_screen.html'))
+
+    # Read up front: the row's values are part of the ETag, so edits show up
+    photo = _slide_photo(photo_index, signature)
+
+    def render_photo():
+        if photo is None:
+            # Deleted since the signature was read
+            return render_template('components/no_photos.html')
+        return render_template('components/photo_display.html', photo=photo)
+
+    rows = [photo] if photo is not None else []
+    return _conditional_fragment('photo', rows, seconds_left, render_photo)
+
+
+@api_bp.route('/current_photo.json')
+def current_photo_json():
+    """Current slide as a small JSON payload, for screens that render it client-side.
+
+    Same slide logic and caching as /current_photo; the HTML route stays for
+    the HTMX big screen.
+    """
+    kind, photo_index, seconds_left, signature = _current_slide()
+    photo = _slide_photo(photo_index, signature) if kind == 'photo' else None
+
+    def render_slide():
+        slide = {'type': kind}
+        if kind == 'photo':
+            if photo is None:
+                # Deleted since the signature was read
+                slide['type'] = 'empty'
+            else:
+                slide.update(
+                    id=photo.id,
+                    filename=photo.filename,
+                    file_type=photo.file_type,
+                    thumbnail=photo.thumbnail,
+                    duration=photo.duration,
+                    guest=photo.guest_name,
+                    wish=photo.wish_message,
+                )
+        return current_app.json.dumps(slide)
+
+    if seconds_left is None:
+        return current_app.response_class(render_slide(), mimetype='application/json')
+
+    rows = [photo] if photo is not None else []
+    return _conditional_fragment(f'json-{kind}', rows, seconds_left, render_slide, mimetype='application/json')
 
 
 @api_bp.route('/photos')
 def photos():
     """Get photos for slideshow."""
-    photos = Photo.query.order_by(Photo.uploaded_at.desc()).limit(20).all()
+    # Newest 20 from the shared snapshot (stored oldest first)
+    photos = load_photos(slideshow_photo_ids()[-20:][::-1])
     
-    if photos:
-        photo_data = []
-        for photo in photos:
-            photo_data.append({
-                'id': photo.id,
-                'filename': photo.filename,
-                'guest_name': photo.guest_name,
-                'wish_message': photo.wish_message,
-                'uploaded_at': photo.uploaded_at.isoformat(),
-                'url': f"/media/photos/{photo.filename}",
-                'file_type': getattr(photo, 'file_type', 'image'),
-                'duration': getattr(photo, 'duration', None)
-            })
-        return jsonify({'photos': photo_data})
-    
-    return jsonify({'photos': []})
+    # Rows always carry file_type and duration, so no getattr fallbacks
+    return jsonify({'photos': [{
+        'id': photo.id,
+        'filename': photo.filename,
+        'guest_name': photo.guest_name,
+        'wish_message': photo.wish_message,
+        'uploaded_at': photo.uploaded_at.isoformat(),
+        'url': f"/media/photos/{photo.filename}",
+        'file_type': photo.file_type,
+        'duration': photo.duration
+    } for photo in photos]})
 
 
 @api_bp.route('/photo_queue')
 @api_bp.route('/photos/queue')
 def photo_queue():
     """Get photo queue for sidebar with currently displaying photo first."""
-    import time
-
-    # Get all photos in the same order as slideshow (oldest first)
-    all_photos = Photo.query.order_by(Photo.uploaded_at.asc()).all()
+    signature = photo_signature()
+    photo_count = signature[0]
 
-    if not all_photos:
+    if not photo_count:
         return render_template('components/photo_queue.html', photos=[])
 
     # Calculate which photo is currently being displayed (same logic as current_photo)
     current_time = int(time.time())
-    slideshow_duration = int(get_setting('slideshow_duration', '8'))
-    interval_type = get_setting('welcome_screen_interval_type', 'photos')
-    interval_value = int(get_setting('welcome_screen_interval_value', '5'))
-
-    # Use same logic as current_photo to determine current photo index
-    current_index = 0
-    if interval_type == 'photos':
-        # Count only photo cycles (not welcome screen cycles)
-        total_photo_cycles = current_time // slideshow_duration
-        cycle_group = total_photo_cycles // (interval_value + 1)
-        position_in_group = total_photo_cycles % (interval_value + 1)
-
-        # If currently showing welcome screen, show the next photo that will be displayed
-        if position_in_group == interval_value:
-            # Welcome screen is showing, next will be first photo of next group
-            actual_photo_cycles = (cycle_group + 1) * interval_value
-        else:
-            # Photo is showing
-            actual_photo_cycles = cycle_group * interval_value + position_in_group
+    timing = get_slideshow_timing()
+    slideshow_duration = timing.slideshow_duration
 
-        current_index = actual_photo_cycles % len(all_photos)
-    else:
-        # Simple cycling for time-based welcome screens
-        current_index = (current_time // slideshow_duration) % len(all_photos)
+    # Same position as current_photo; while the welcome screen shows, the
+    # photo cycle already points at the next photo to be displayed
+    _, photo_cycle = slideshow_position(current_time, timing)
+    current_index = photo_cycle % photo_count
+
+    # Get all photo ids in the same order as slideshow (oldest first)
+    all_ids = slideshow_photo_ids(signature)
+
+    # Reorder so current photo is first, then the next ones in sequence
+    queue_ids = []
+    for i in range(min(8, len(all_ids))):  # Show up to 8 photos
+        photo_index = (current_index + i) % len(all_ids)
+        queue_ids.append(all_ids[photo_index])
 
-    # Reorder photos so current photo is first, then the next ones in sequence
-    reordered_photos = []
-    for i in range(min(8, len(all_photos))):  # Show up to 8 photos
-        photo_index = (current_index + i) % len(all_photos)
-        reordered_photos.append(all_photos[photo_index])
+    # Full rows for the displayed photos only, in one query; read up front
+    # because their values are part of the ETag
+    queue = load_photos(queue_ids)
 
-    return render_template('components/photo_queue.html', photos=reordered_photos)
+    # The queue only changes when the slide advances or its photos change
+    seconds_left = slideshow_duration - current_time % slideshow_duration
+    return _conditional_fragment('queue', queue, seconds_left,
+                                 lambda: render_template('components/photo_queue.html', photos=queue))
+
+
+# Songs shown in the big screen's "up next" sidebar
+MUSIC_QUEUE_SIZE = 4
 
 
 @api_bp.route('/music_queue')
@@ -155,49 +252,63 @@ def music_queue():
     """Get music queue for sidebar (excluding currently playing song)."""
     from app.models import Guest
     
-    # Get all unplayed songs in order
-    all_songs = MusicQueue.query.filter_by(played_at=None).order_by(MusicQueue.submitted_at.asc()).all()
+    # Unplayed songs in order as read-only rows of just what the sidebar
+    # shows, with the guest label worked out in SQL. One extra row covers
+    # skipping the currently playing song.
+    guest_name = case(
+        (MusicQueue.guest_id.is_(None), 'Anonymous'),
+        else_=func.coalesce(Guest.name, 'Unknown Guest'),
+    ).label('guest_name')
+    rows = db.session.execute(
+        select(MusicQueue.id, MusicQueue.song_title, MusicQueue.artist, MusicQueue.source,
+               MusicQueue.status, MusicQueue.filename, guest_name)
+        .outerjoin(Guest, Guest.id == MusicQueue.guest_id)
+        .where(MusicQueue.played_at.is_(None))
+        .order_by(MusicQueue.submitted_at.asc())
+        .limit(MUSIC_QUEUE_SIZE + 1)
+    ).all()
     
     # Exclude the currently playing song (first ready song with filename)
     queue = []
     found_current = False
-    for song in all_songs:
+    for song in rows:
         # Skip the first ready song with filename (this is the currently playing one)
         if not found_current and song.status == 'ready' and song.filename:
             found_current = True
             continue
         queue.append(song)
         # Limit to 4 songs as requested
-        if len(queue) >= 4:
+        if len(queue) >= MUSIC_QUEUE_SIZE:
             break
     
-    # Get guest names for each song
-    for song in queue:
-        if song.guest_id:
-            guest = Guest.query.get(song.guest_id)
-            if guest:
-                song.guest_name = guest.name
-            else:
-                song.guest_name = "Unknown Guest"
-        else:
-            song.guest_name = "Anonymous"
-    
-    return render_template('components/music_queue.html', music_queue=queue)
+    # Songs change on submissions, downloads and skips rather than on a
+    # schedule, so every poll revalidates; unchanged queues get a 304
+    return _conditional_fragment('music', queue, 0,
+                                 lambda: render_template('components/music_queue.html', music_queue=queue))
 
 
 @api_bp.route('/stats')
 def stats():
     """Get party statistics."""
-    from app.models import Guest
+    counts = get_recent_party_counts()
     
     stats = {
-        'photos': Photo.query.count(),
-        'guests': Guest.query.count(),
-        'music_requests': MusicQueue.query.count(),
+        'photos': counts['total_photos'],
+        'guests': counts['total_guests'],
+        'music_requests': counts['music_requests'],
         'party_title': get_setting('party_title', 'Birthday Celebration')
     }
     
-    return jsonify(stats)
+    # ETag over the body so unchanged stats cost pollers a 304
+    response = jsonify(stats)
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@lru_cache(maxsize=1)
+def _cached_network_ip(window):
+    """Probe the host IP once per TTL window; the probe shells out to `ip`."""
+    return get_network_ip()
 
 
 @api_bp.route('/network_info')
@@ -221,7 +332,7 @@ def network_info():
         })
     else:
         # Use auto-detected IP (current behavior)
-        network_ip = get_network_ip()
+        network_ip = _cached_network_ip(int(time.time()) // NETWORK_IP_TTL)
         mobile_url = f"http://{network_ip}:{port}/mobile"
         return jsonify({
             'network_ip': network_ip,
@@ -244,10 +355,8 @@ def reset_test_data():
         # Delete all music queue entries
         MusicQueue.query.delete()
         
-        # Reset guest submission counts but keep guests
-        guests = Guest.query.all()
-        for guest in guests:
-            guest.total_submissions = 0
+        # Reset guest submission counts but keep guests (one UPDATE for all rows)
+        Guest.query.update({Guest.total_submissions: 0}, synchronize_session=False)
         
         db.session.commit()
         
@@ -263,13 +372,51 @@ def reset_test_data():
         })
 
 
+def _player_song_query():
+    """MusicQueue query that loads the guest and their wish with the song itself.
+
+    Any other relationship raises instead of lazy-loading, so a new per-song
+    query in the player endpoints shows up as an error rather than an N+1.
+    """
+    return MusicQueue.query.options(joinedload(MusicQueue.guest), undefer(MusicQueue.guest_wish),
+                                    raiseload('*'))
+
+
+def _song_guest(song):
+    """Return (guest name, wish from the guest's photo or None) for a queued song."""
+    guest = song.guest if song.guest_id else None
+    if not guest:
+        return "Anonymous", None
+    return guest.name, song.guest_wish or None
+
+
+def _serialize_song(song, guest_name=None, guest_wish=None):
+    """JSON payload the player expects for a ready song; guest fields only when given."""
+    data = {
+        'id': song.id,
+        'title': song.song_title,
+        'artist': song.artist,
+        'album': song.album,
+        'file_url': f"/media/music/{song.filename}",
+        'source': song.source,
+        'status': song.status,
+    }
+    if guest_name is not None:
+        data['guest_name'] = guest_name
+    submitted_at = song.submitted_at
+    data['submitted_at'] = submitted_at.isoformat() if submitted_at else None
+
+    # Add wish if available
+    if guest_wish:
+        data['guest_wish'] = guest_wish
+    return data
+
+
 @api_bp.route('/music/current')
 def get_current_song():
     """Get currently playing song (only ready songs with files)."""
-    from app.models import Guest
-    
-    # Get the first ready song that hasn't been played yet
-    current_song = MusicQueue.query.filter_by(
+    # Get the first ready song that hasn't been played yet (guest and wish loaded in the same query)
+    current_song = _player_song_query().filter_by(
         played_at=None, 
         status='ready'
     ).filter(
@@ -277,39 +424,7 @@ def get_current_song():
     ).order_by(MusicQueue.submitted_at.asc()).first()
     
     if current_song and current_song.filename:
-        # Get guest information
-        guest_name = "Anonymous"
-        guest_wish = None
-        if current_song.guest_id:
-            guest = Guest.query.get(current_song.guest_id)
-            if guest:
-                guest_name = guest.name
-
-                # Look up guest's photo with wish
-                guest_photo = Photo.query.filter_by(guest_id=current_song.guest_id).first()
-                if guest_photo and guest_photo.wish_message:
-                    guest_wish = guest_photo.wish_message
-
-        # Construct file URL
-        file_url = f"/media/music/{current_song.filename}"
-
-        response_data = {
-            'id': current_song.id,
-            'title': current_song.song_title,
-            'artist': current_song.artist,
-            'album': current_song.album,
-            'file_url': file_url,
-            'source': current_song.source,
-            'status': current_song.status,
-            'guest_name': guest_name,
-            'submitted_at': current_song.submitted_at.isoformat() if current_song.submitted_at else None
-        }
-
-        # Add wish if available
-        if guest_wish:
-            response_data['guest_wish'] = guest_wish
-
-        return jsonify(response_data)
+        return jsonify(_serialize_song(current_song, *_song_guest(current_song)))
     
     return jsonify({'error': 'No ready song available'})
 
@@ -317,60 +432,26 @@ def get_current_song():
 @api_bp.route('/music/next', methods=['POST'])
 def next_song():
     """Mark current song as played and get next ready song."""
-    from app.models import Guest
-    
-    # Mark current ready song as played
-    current_song = MusicQueue.query.filter_by(
+    # Current and next ready songs in one query (guests and wishes loaded alongside)
+    songs = _player_song_query().filter_by(
         played_at=None, 
         status='ready'
     ).filter(
         MusicQueue.filename.isnot(None)
-    ).order_by(MusicQueue.submitted_at.asc()).first()
+    ).order_by(MusicQueue.submitted_at.asc()).limit(2).all()
     
-    if current_song:
-        current_song.played_at = datetime.now()
-        db.session.commit()
+    # Build the reply before committing, which would expire the loaded rows
+    next_song = songs[1] if len(songs) > 1 else None
+    response_data = None
+    if next_song and next_song.filename:
+        response_data = _serialize_song(next_song, *_song_guest(next_song))
     
-    # Get next ready song
-    next_song = MusicQueue.query.filter_by(
-        played_at=None, 
-        status='ready'
-    ).filter(
-        MusicQueue.filename.isnot(None)
-    ).order_by(MusicQueue.submitted_at.asc()).first()
+    # Mark current ready song as played
+    if songs:
+        songs[0].played_at = datetime.now()
+        db.session.commit()
     
-    if next_song and next_song.filename:
-        # Get guest information
-        guest_name = "Anonymous"
-        guest_wish = None
-        if next_song.guest_id:
-            guest = Guest.query.get(next_song.guest_id)
-            if guest:
-                guest_name = guest.name
-
-                # Look up guest's photo with wish
-                guest_photo = Photo.query.filter_by(guest_id=next_song.guest_id).first()
-                if guest_photo and guest_photo.wish_message:
-                    guest_wish = guest_photo.wish_message
-
-        file_url = f"/media/music/{next_song.filename}"
-
-        response_data = {
-            'id': next_song.id,
-            'title': next_song.song_title,
-            'artist': next_song.artist,
-            'album': next_song.album,
-            'file_url': file_url,
-            'source': next_song.source,
-            'status': next_song.status,
-            'guest_name': guest_name,
-            'submitted_at': next_song.submitted_at.isoformat() if next_song.submitted_at else None
-        }
-
-        # Add wish if available
-        if guest_wish:
-            response_data['guest_wish'] = guest_wish
-
+    if response_data:
         return jsonify(response_data)
     
     return jsonify({'error': 'No next ready song available'})
@@ -379,10 +460,8 @@ def next_song():
 @api_bp.route('/music/previous', methods=['POST'])  
 def previous_song():
     """Get previous song (last played ready song)."""
-    from app.models import Guest
-    
-    # Get the most recently played ready song with a file
-    previous_song = MusicQueue.query.filter(
+    # Get the most recently played ready song with a file (guest and wish loaded in the same query)
+    previous_song = _player_song_query().filter(
         MusicQueue.played_at.is_not(None),
         MusicQueue.status == 'ready'
     ).filter(
@@ -390,41 +469,13 @@ def previous_song():
     ).order_by(MusicQueue.played_at.desc()).first()
     
     if previous_song and previous_song.filename:
+        # Build the reply before committing, which would expire the loaded row
+        response_data = _serialize_song(previous_song, *_song_guest(previous_song))
+        
         # Mark it as unplayed so it can be played again
         previous_song.played_at = None
         db.session.commit()
         
-        # Get guest information
-        guest_name = "Anonymous"
-        guest_wish = None
-        if previous_song.guest_id:
-            guest = Guest.query.get(previous_song.guest_id)
-            if guest:
-                guest_name = guest.name
-
-                # Look up guest's photo with wish
-                guest_photo = Photo.query.filter_by(guest_id=previous_song.guest_id).first()
-                if guest_photo and guest_photo.wish_message:
-                    guest_wish = guest_photo.wish_message
-
-        file_url = f"/media/music/{previous_song.filename}"
-
-        response_data = {
-            'id': previous_song.id,
-            'title': previous_song.song_title,
-            'artist': previous_song.artist,
-            'album': previous_song.album,
-            'file_url': file_url,
-            'source': previous_song.source,
-            'status': previous_song.status,
-            'guest_name': guest_name,
-            'submitted_at': previous_song.submitted_at.isoformat() if previous_song.submitted_at else None
-        }
-
-        # Add wish if available
-        if guest_wish:
-            response_data['guest_wish'] = guest_wish
-
         return jsonify(response_data)
     
     return jsonify({'error': 'No previous ready song available'})
@@ -433,20 +484,9 @@ def previous_song():
 @api_bp.route('/music/play/<int:song_id>', methods=['POST'])
 def play_song(song_id):
     """Play a specific song by ID (only if ready)."""
-    song = MusicQueue.query.get_or_404(song_id)
+    song = db.get_or_404(MusicQueue, song_id)
     
     if song.filename and song.status == 'ready':
-        file_url = f"/media/music/{song.filename}"
-        
-        return jsonify({
-            'id': song.id,
-            'title': song.song_title,
-            'artist': song.artist,
-            'album': song.album,
-            'file_url': file_url,
-            'source': song.source,
-            'status': song.status,
-            'submitted_at': song.submitted_at.isoformat() if song.submitted_at else None
-        })
+        return jsonify(_serialize_song(song))
     
     return jsonify({'error': 'Song file not ready or not available'})
\ No newline at end of file
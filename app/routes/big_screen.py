@@ -1,35 +1,66 @@
 """Big screen display routes for photo slideshow and music management."""
 
 import os
+import hashlib
 from datetime import datetime, timedelta
-from flask import Blueprint, render_template, jsonify, request, current_app
-from app.models import Photo, MusicQueue, MusicLibrary, get_setting, update_setting
-from utils.music_library import music_search
+from flask import Blueprint, render_template, jsonify, request, current_app, session, make_response, abort
+from app import db
+from app.models import Photo, MusicQueue, MusicLibrary, get_setting, get_settings_bulk, update_setting, get_recent_party_counts
+from utils.music_library import music_search, get_recent_library_stats
 from app.services.auth import guest_required
 
 big_screen_bp = Blueprint('big_screen', __name__)
 
+# Prerendered kiosk page shells keyed by (template, settings baked into the HTML).
+# Photos, queue and stats are polled from /api, so the shell only changes with settings.
+_shell_cache = {}
+
+
+def _render_shell(template, **context):
+    """Serve a big screen shell rendered once per settings combination, with an ETag."""
+    # Pending flash messages are part of the page, so render those fresh
+    if session.get('_flashes'):
+        return render_template(template, **context)
+
+    key = (template, tuple(sorted(context.items())))
+    cached = _shell_cache.get(key)
+    if cached is None:
+        html = render_template(template, **context)
+        cached = (html, hashlib.md5(html.encode('utf-8')).hexdigest())
+        if len(_shell_cache) > 32:
+            _shell_cache.clear()  # Settings changed many times; drop stale shells
+        _shell_cache[key] = cached
+
+    html, etag = cached
+    response = make_response(html)
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True  # Revalidate, usually answered with a 304
+    return response.make_conditional(request)
+
 
 @big_screen_bp.route('/')
 @guest_required
 def big_screen():
     """Main big screen display interface."""
     slideshow_duration = int(get_setting('slideshow_duration', 8))
-    return render_template('big_screen/display.html', slideshow_duration=slideshow_duration)
+    return _render_shell('big_screen/display.html', slideshow_duration=slideshow_duration)
 
 
 @big_screen_bp.route('/slideshow')
 @guest_required
 def slideshow():
     """Full screen slideshow with TikTok-style text animations."""
-    party_title = get_setting('party_title', 'Birthday Celebration')
-    host_name = get_setting('host_name', 'Birthday Star')
-    slideshow_duration = int(get_setting('slideshow_duration', 8))
+    settings = get_settings_bulk({
+        'party_title': 'Birthday Celebration',
+        'host_name': 'Birthday Star',
+        'slideshow_duration': 8,
+    })
     
-    return render_template('big_screen/slideshow.html', 
-                         party_title=party_title,
-                         host_name=host_name,
-                         slideshow_duration=slideshow_duration)
+    return _render_shell('big_screen/slideshow.html',
+                         party_title=settings['party_title'],
+                         host_name=settings['host_name'],
+                         slideshow_duration=int(settings['slideshow_duration']))
 
 
 @big_screen_bp.route('/api/photos')
@@ -38,21 +69,21 @@ def get_photos():
     # Get photos that haven't been displayed recently (last 30 minutes)
     recent_cutoff = datetime.now() - timedelta(minutes=30)
     
-    photos = Photo.query.filter(
-        (Photo.displayed_at.is_(None)) | 
-        (Photo.displayed_at < recent_cutoff)
-    ).order_by(Photo.uploaded_at.desc()).limit(20).all()
-    
-    photo_data = []
-    for photo in photos:
-        photo_data.append({
-            'id': photo.id,
-            'filename': photo.filename,
-            'guest_name': photo.guest_name,
-            'wish_message': photo.wish_message,
-            'uploaded_at': photo.uploaded_at.isoformat(),
-            'url': f"/media/photos/{photo.filename}"
-        })
+    # Plain rows with just the fields we send, no ORM objects
+    photos = db.session.execute(
+        db.select(Photo.id, Photo.filename, Photo.guest_name, Photo.wish_message, Photo.uploaded_at)
+        .where((Photo.displayed_at.is_(None)) | (Photo.displayed_at < recent_cutoff))
+        .order_by(Photo.uploaded_at.desc()).limit(20)
+    ).all()
+    
+    photo_data = [{
+        'id': photo.id,
+        'filename': photo.filename,
+        'guest_name': photo.guest_name,
+        'wish_message': photo.wish_message,
+        'uploaded_at': photo.uploaded_at.isoformat(),
+        'url': f"/media/photos/{photo.filename}"
+    } for photo in photos]
     
     # If HTMX request, return partial template
     if request.headers.get('HX-Request') == 'true':
@@ -64,10 +95,11 @@ def get_photos():
 @big_screen_bp.route('/api/photos/<int:photo_id>/displayed', methods=['POST'])
 def mark_photo_displayed(photo_id):
     """Mark a photo as displayed."""
-    photo = Photo.query.get_or_404(photo_id)
-    photo.displayed_at = datetime.now()
-    
-    from app import db
+    # Single UPDATE; no row is loaded first
+    updated = Photo.query.filter_by(id=photo_id)\
+        .update({Photo.displayed_at: datetime.now()}, synchronize_session=False)
+    if not updated:
+        abort(404)
     db.session.commit()
     
     return jsonify({'success': True})
@@ -121,10 +153,11 @@ def get_music_queue():
 @big_screen_bp.route('/api/music/queue/<int:queue_id>/played', methods=['POST'])
 def mark_music_played(queue_id):
     """Mark a music item as played."""
-    queue_item = MusicQueue.query.get_or_404(queue_id)
-    queue_item.played_at = datetime.now()
-    
-    from app import db
+    # Single UPDATE; no row is loaded first
+    updated = MusicQueue.query.filter_by(id=queue_id)\
+        .update({MusicQueue.played_at: datetime.now()}, synchronize_session=False)
+    if not updated:
+        abort(404)
     db.session.commit()
     
     return jsonify({'success': True})
@@ -133,11 +166,17 @@ def mark_music_played(queue_id):
 @big_screen_bp.route('/api/settings')
 def get_settings():
     """Get display settings for big screen."""
+    values = get_settings_bulk({
+        'slideshow_duration': 8,
+        'auto_play_music': 'true',
+        'party_title': '50th Birthday Celebration',
+        'host_name': 'Birthday Star',
+    })
     settings = {
-        'slideshow_duration': int(get_setting('slideshow_duration', 8)),
-        'auto_play_music': get_setting('auto_play_music', 'true') == 'true',
-        'party_title': get_setting('party_title', '50th Birthday Celebration'),
-        'host_name': get_setting('host_name', 'Birthday Star')
+        'slideshow_duration': int(values['slideshow_duration']),
+        'auto_play_music': values['auto_play_music'] == 'true',
+        'party_title': values['party_title'],
+        'host_name': values['host_name']
     }
     
     return jsonify(settings)
@@ -160,21 +199,23 @@ def update_settings():
 @big_screen_bp.route('/api/stats')
 def get_stats():
     """Get party statistics for big screen."""
-    from app.models import Guest
-
-    total_photos = Photo.query.count()
-    total_music_requests = MusicQueue.query.count()
-    total_guests = Guest.query.count()
+    counts = get_recent_party_counts()
+    total_photos = counts['total_photos']
+    total_music_requests = counts['music_requests']
+    total_guests = counts['total_guests']
 
-    # Get music library stats
-    music_stats = music_search.get_library_stats()
+    # Library stats only change on reindex, which clears the cache
+    music_stats = get_recent_library_stats()
 
-    return jsonify({
+    # ETag over the body so unchanged stats cost pollers a 304
+    response = jsonify({
         'photos': total_photos,
         'music_requests': total_music_requests,
         'guests': total_guests,
         'music_library': music_stats
     })
+    response.add_etag()
+    return response.make_conditional(request)
 
 
 @big_screen_bp.route('/print/wifi')
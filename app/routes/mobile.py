@@ -2,17 +2,35 @@
 
 import os
 import uuid
-import threading
+import logging
 import datetime
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import MemoryHandler, RotatingFileHandler
 from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, session, jsonify
 from werkzeug.utils import secure_filename
 from PIL import Image
 from app import db
-from app.models import Guest, Photo, MusicQueue, get_setting
+from app.models import Guest, Photo, MusicQueue, get_setting, get_settings_bulk
 from app.services.auth import guest_required, is_admin_authenticated, is_guest_authenticated
 
 mobile_bp = Blueprint('mobile', __name__)
 
+# Submission trace (SUBMISSION_DEBUG). Records are buffered and written in
+# batches, flushed early by errors, instead of reopening the file per line.
+_submission_log = logging.getLogger('pixelparty.submission')
+_submission_log.setLevel(logging.DEBUG)
+_submission_log.propagate = False
+_submission_log_file = RotatingFileHandler('submission_debug.log', maxBytes=1_000_000, backupCount=3,
+                                           encoding='utf-8', delay=True)
+_submission_log_file.setFormatter(logging.Formatter('%(message)s'))
+_submission_log.addHandler(MemoryHandler(64, flushLevel=logging.ERROR, target=_submission_log_file))
+
+
+def _log_submission(message, level=logging.DEBUG):
+    """Add a line to submission_debug.log when SUBMISSION_DEBUG is enabled."""
+    if current_app.config.get('SUBMISSION_DEBUG'):
+        _submission_log.log(level, message)
+
 
 def validate_utf8_text(text):
     """Validate that text is properly UTF-8 encoded and safe for database storage."""
@@ -65,7 +83,7 @@ def download_youtube_async(video_url, title, artist, app, music_request_id):
             try:
                 # Update status to downloading
                 log_to_file("📊 Querying database for music request")
-                music_request = MusicQueue.query.get(music_request_id)
+                music_request = db.session.get(MusicQueue, music_request_id)
                 if music_request:
                     log_to_file(f"✅ Found music request: {music_request.song_title}")
                     music_request.status = 'downloading'
@@ -187,7 +205,7 @@ def download_youtube_async(video_url, title, artist, app, music_request_id):
                 if actual_filename:
                     # Update database entry with filename and status
                     log_to_file(f"✅ Found file, updating database with: {actual_filename}")
-                    music_request = MusicQueue.query.get(music_request_id)  # Re-query to avoid stale session
+                    music_request = db.session.get(MusicQueue, music_request_id)  # Re-query to avoid stale session
                     if music_request:
                         music_request.filename = actual_filename
                         music_request.status = 'ready'
@@ -220,7 +238,7 @@ def download_youtube_async(video_url, title, artist, app, music_request_id):
 
                 try:
                     if music_request_id:
-                        music_request = MusicQueue.query.get(music_request_id)  # Re-query to avoid stale session
+                        music_request = db.session.get(MusicQueue, music_request_id)  # Re-query to avoid stale session
                         if music_request:
                             music_request.status = 'error'
                             db.session.flush()  # Immediate flush for status visibility
@@ -245,7 +263,7 @@ def download_youtube_async(video_url, title, artist, app, music_request_id):
             with app.app_context():
                 from app import db
                 from app.models import MusicQueue
-                music_request = MusicQueue.query.get(music_request_id)
+                music_request = db.session.get(MusicQueue, music_request_id)
                 if music_request:
                     music_request.status = 'error'
                     db.session.flush()  # Immediate flush for status visibility
@@ -257,6 +275,19 @@ def download_youtube_async(video_url, title, artist, app, music_request_id):
     log_to_file("🏁 Thread finished")
 
 
+# Background YouTube downloads; a burst of requests queues here instead of
+# starting a thread per song
+YOUTUBE_DOWNLOAD_WORKERS = 4
+_youtube_download_executor = ThreadPoolExecutor(max_workers=YOUTUBE_DOWNLOAD_WORKERS,
+                                                thread_name_prefix='YouTubeDownload')
+
+
+def start_youtube_download(video_url, title, artist, app, music_request_id):
+    """Queue download_youtube_async for a music request on the download pool."""
+    return _youtube_download_executor.submit(download_youtube_async, video_url, title, artist,
+                                             app, music_request_id)
+
+
 @mobile_bp.route('/')
 def index():
     """Mobile index goes directly to the main form."""
@@ -265,8 +296,20 @@ def index():
 
 def allowed_file(filename):
     """Check if file extension is allowed."""
-    return ('.' in filename and 
-            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS'])
+    _, dot, ext = filename.rpartition('.')
+    return bool(dot) and ext.lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+
+# Party names shown on the guest pages, with their defaults
+PARTY_NAME_DEFAULTS = {
+    'party_title': 'Birthday Celebration',
+    'host_name': 'Birthday Star',
+}
+
+
+def party_names():
+    """Return {'party_title': ..., 'host_name': ...} from one settings cache snapshot."""
+    return get_settings_bulk(PARTY_NAME_DEFAULTS)
 
 
 def is_htmx_request():
@@ -301,7 +344,7 @@ def main_form():
             flash('Admin access required to edit entries', 'error')
             return redirect(url_for('auth.admin_login'))
 
-        photo = Photo.query.get_or_404(int(edit_id))
+        photo = db.get_or_404(Photo, int(edit_id))
     else:
         # For regular mode, require guest authentication
         from app.services.auth import guest_required
@@ -310,16 +353,12 @@ def main_form():
             flash('Please enter the party password to continue! 🎉', 'info')
             return redirect(url_for('auth.guest_login'))
 
-    party_title = get_setting('party_title', 'Birthday Celebration')
-    host_name = get_setting('host_name', 'Birthday Star')
-
     # Get counts for sidebar stats
     photo_count = Photo.query.count()
     music_count = MusicQueue.query.count()
 
     return render_template('mobile/main_form.html',
-                         party_title=party_title,
-                         host_name=host_name,
+                         **party_names(),
                          photo_count=photo_count,
                          music_count=music_count,
                          photo=photo,
@@ -335,8 +374,7 @@ def enter():
         if is_htmx_request():
             flash('Please enter your name to continue! ✨', 'error')
             return render_template('mobile/welcome.html', 
-                                 party_title=get_setting('party_title', 'Birthday Celebration'),
-                                 host_name=get_setting('host_name', 'Birthday Star'))
+                                 **party_names())
         else:
             flash('Please enter your name', 'error')
             return redirect(url_for('mobile.welcome'))
@@ -368,7 +406,7 @@ def upload():
             flash('Admin access required to edit entries', 'error')
             return redirect(url_for('auth.admin_login'))
 
-        photo = Photo.query.get_or_404(int(edit_id))
+        photo = db.get_or_404(Photo, int(edit_id))
 
         return render_template('mobile/upload.html',
                              guest_name=photo.guest_name,
@@ -393,19 +431,15 @@ def submit_memory():
         is_edit_mode = bool(edit_id)
         existing_photo = None
 
-        with open('submission_debug.log', 'a') as f:
-            f.write(f"DEBUG: Starting submit_memory, edit_id={edit_id}, is_edit_mode={is_edit_mode}\n")
+        _log_submission(f"DEBUG: Starting submit_memory, edit_id={edit_id}, is_edit_mode={is_edit_mode}")
 
         if is_edit_mode:
             # Get the existing photo once at the beginning
-            with open('submission_debug.log', 'a') as f:
-                f.write(f"DEBUG: About to query photo with edit_id={edit_id}\n")
-            existing_photo = Photo.query.get_or_404(int(edit_id))
-            with open('submission_debug.log', 'a') as f:
-                f.write(f"DEBUG: Photo found: {existing_photo.id}\n")
+            _log_submission(f"DEBUG: About to query photo with edit_id={edit_id}")
+            existing_photo = db.get_or_404(Photo, int(edit_id))
+            _log_submission(f"DEBUG: Photo found: {existing_photo.id}")
     except Exception as e:
-        with open('submission_debug.log', 'a') as f:
-            f.write(f"ERROR in submit_memory start: {str(e)}\n")
+        _log_submission(f"ERROR in submit_memory start: {str(e)}", logging.ERROR)
         raise
 
     # Check authentication based on mode
@@ -424,54 +458,42 @@ def submit_memory():
     guest_name = request.form.get('guest_name', '').strip()
 
     # Log the submission attempt
-    with open('submission_debug.log', 'a') as f:
-        f.write(f"\n=== SUBMISSION ATTEMPT ===\n")
-        f.write(f"Form keys: {list(request.form.keys())}\n")
-        f.write(f"Files keys: {list(request.files.keys())}\n")
-        f.write(f"guest_name: '{guest_name}'\n")
+    _log_submission(f"\n=== SUBMISSION ATTEMPT ===\n"
+                    f"Form keys: {list(request.form.keys())}\n"
+                    f"Files keys: {list(request.files.keys())}\n"
+                    f"guest_name: '{guest_name}'")
 
     # Validate guest name
     if not guest_name:
-        with open('submission_debug.log', 'a') as f:
-            f.write(f"FAIL: No guest name\n")
+        _log_submission(f"FAIL: No guest name")
         flash('Please enter your name', 'error')
         return redirect(url_for('mobile.main_form'))
 
     # Validate UTF-8 encoding for guest name (emoji support)
     is_valid, guest_name = validate_utf8_text(guest_name)
     if not is_valid:
-        with open('submission_debug.log', 'a', encoding='utf-8') as f:
-            f.write(f"FAIL: Invalid UTF-8 in guest name\n")
+        _log_submission(f"FAIL: Invalid UTF-8 in guest name")
         flash('Invalid characters in your name. Please use standard text and emojis only.', 'error')
         return redirect(url_for('mobile.main_form'))
 
-    with open('submission_debug.log', 'a') as f:
-        f.write(f"PASS: Guest name validation\n")
+    _log_submission(f"PASS: Guest name validation")
 
     # Handle guest differently for edit vs new submissions
     if is_edit_mode:
-        with open('submission_debug.log', 'a') as f:
-            f.write(f"EDIT MODE: Getting guest for edit_id={edit_id}\n")
+        _log_submission(f"EDIT MODE: Getting guest for edit_id={edit_id}")
         # For edit mode, get the guest from the existing photo
         guest = existing_photo.guest or Guest.query.filter_by(name=guest_name).first()
         if not guest:
-            with open('submission_debug.log', 'a') as f:
-                f.write(f"EDIT MODE: Creating fallback guest\n")
-            # Fallback: create guest if somehow missing
+            _log_submission(f"EDIT MODE: Creating fallback guest")
+            # Fallback: create guest if somehow missing (committed with the photo below)
             session_id = str(uuid.uuid4())
             guest = Guest(name=guest_name, session_id=session_id)
             db.session.add(guest)
-            db.session.commit()
-        with open('submission_debug.log', 'a') as f:
-            f.write(f"EDIT MODE: Guest found/created: {guest.name} (ID: {guest.id})\n")
-    else:
-        # For new submissions, create or get guest based on form name
-        session_id = str(uuid.uuid4())
-        guest = Guest.query.filter_by(name=guest_name).first()
-        if not guest:
-            guest = Guest(name=guest_name, session_id=session_id)
-            db.session.add(guest)
-            db.session.commit()
+            db.session.flush()
+        _log_submission(f"EDIT MODE: Guest found/created: {guest.name} (ID: {guest.id})")
+
+    # New submissions get their guest just before the photo row is built, so
+    # no write transaction is open while the upload is processed
     
     # Get form data
     wish_message = request.form.get('wish_message', '').strip()
@@ -498,17 +520,14 @@ def submit_memory():
     if not file or file.filename == '':
         # No file uploaded - this is now allowed for both new and edit modes
         file = None
-        with open('submission_debug.log', 'a') as f:
-            f.write(f"INFO: No file uploaded - proceeding with wish-only submission\n")
+        _log_submission(f"INFO: No file uploaded - proceeding with wish-only submission")
     
     # Only check file if it's not None (for edit mode without new file)
     if file:
-        with open('submission_debug.log', 'a') as f:
-            f.write(f"PASS: File exists - {file.filename}\n")
+        _log_submission(f"PASS: File exists - {file.filename}")
 
         if not allowed_file(file.filename):
-            with open('submission_debug.log', 'a') as f:
-                f.write(f"FAIL: File type not allowed - {file.filename}\n")
+            _log_submission(f"FAIL: File type not allowed - {file.filename}")
             supported_formats = ', '.join(current_app.config['ALLOWED_EXTENSIONS'])
             error_msg = f'File type not supported. Please use: {supported_formats}'
             if is_htmx_request():
@@ -519,11 +538,9 @@ def submit_memory():
                 flash(error_msg, 'error')
                 return redirect(url_for('mobile.upload'))
 
-        with open('submission_debug.log', 'a') as f:
-            f.write(f"PASS: File type allowed\n")
+        _log_submission(f"PASS: File type allowed")
     else:
-        with open('submission_debug.log', 'a') as f:
-            f.write(f"EDIT MODE: No new file uploaded, keeping existing\n")
+        _log_submission(f"EDIT MODE: No new file uploaded, keeping existing")
     
     if not wish_message:
         error_msg = 'Please write a birthday wish to go with your photo! 💝'
@@ -567,17 +584,14 @@ def submit_memory():
             try:
                 # Use FileHandler for proper file processing and validation
                 from app.services.file_handler import file_handler
-                import asyncio
 
-                # Get file data
-                file_data = file.read()
                 original_filename = file.filename
 
-                # Save file using FileHandler (handles both images and videos)
-                def run_async_save():
-                    return asyncio.run(file_handler.save_file(file_data, original_filename, guest.name))
-
-                success, message, unique_filename = run_async_save()
+                # Save straight from Werkzeug's spooled upload (handles both
+                # images and videos) instead of reading it into memory first
+                success, message, unique_filename = file_handler.save_upload(
+                    file.stream, original_filename,
+                    guest.name if is_edit_mode else guest_name)
 
                 if not success:
                     error_msg = f'Upload failed: {message}'
@@ -630,6 +644,15 @@ def submit_memory():
                 photo.duration = video_duration
                 photo.thumbnail = thumbnail_filename
         else:
+            # Create or get guest based on form name. A new guest is only
+            # flushed for its id; it is committed in the same transaction as
+            # the photo and song.
+            guest = Guest.query.filter_by(name=guest_name).first()
+            if not guest:
+                guest = Guest(name=guest_name, session_id=str(uuid.uuid4()))
+                db.session.add(guest)
+                db.session.flush()
+
             # Create new photo record (filename can be None for wish-only submissions)
             photo = Photo(
                 guest_id=guest.id,
@@ -786,17 +809,12 @@ def submit_memory():
                     # Start YouTube download if needed (after we have the ID)
                     if youtube_download_needed:
                         try:
-                            current_app.logger.info(f"🎵 Starting download thread for: {youtube_data[1]} by {youtube_data[2]} (ID: {music_request.id})")
-                            download_thread = threading.Thread(
-                                target=download_youtube_async,
-                                args=(youtube_data[0], youtube_data[1], youtube_data[2], current_app._get_current_object(), music_request.id),
-                                name=f"YouTubeDownload-{music_request.id}"
-                            )
-                            download_thread.daemon = True
-                            download_thread.start()
-                            current_app.logger.info(f"✅ Download thread started successfully for ID {music_request.id}")
+                            current_app.logger.info(f"🎵 Queueing download for: {youtube_data[1]} by {youtube_data[2]} (ID: {music_request.id})")
+                            start_youtube_download(youtube_data[0], youtube_data[1], youtube_data[2],
+                                                   current_app._get_current_object(), music_request.id)
+                            current_app.logger.info(f"✅ Download queued successfully for ID {music_request.id}")
                         except Exception as e:
-                            current_app.logger.error(f"❌ Failed to start download thread: {e}")
+                            current_app.logger.error(f"❌ Failed to queue download: {e}")
                             import traceback
                             current_app.logger.error(f"❌ Thread start traceback: {traceback.format_exc()}")
                             
@@ -808,28 +826,29 @@ def submit_memory():
             guest.total_submissions += 1
 
         # DEBUG: Log before commit
-        with open('submission_debug.log', 'a') as f:
-            f.write(f"DEBUG: About to commit to database\n")
-            f.write(f"Photo ID: {photo.id if hasattr(photo, 'id') else 'NEW'}\n")
-            f.write(f"Guest name: {photo.guest_name}\n")
-            f.write(f"Wish: {photo.wish_message}\n")
-            f.write(f"Filename: {photo.filename}\n")
-            f.write(f"File type: {photo.file_type}\n")
+        _log_submission(f"DEBUG: About to commit to database\n"
+                        f"Photo ID: {photo.id if hasattr(photo, 'id') else 'NEW'}\n"
+                        f"Guest name: {photo.guest_name}\n"
+                        f"Wish: {photo.wish_message}\n"
+                        f"Filename: {photo.filename}\n"
+                        f"File type: {photo.file_type}")
 
         try:
             db.session.commit()
-            with open('submission_debug.log', 'a') as f:
-                f.write(f"SUCCESS: Database commit successful, Photo ID: {photo.id}\n")
+            _log_submission(f"SUCCESS: Database commit successful, Photo ID: {photo.id}")
         except Exception as commit_error:
-            with open('submission_debug.log', 'a') as f:
-                f.write(f"ERROR: Database commit failed: {commit_error}\n")
+            _log_submission(f"ERROR: Database commit failed: {commit_error}", logging.ERROR)
             db.session.rollback()
 
             # WORKAROUND: Use raw SQL insert since ORM is failing
             try:
-                from sqlalchemy import text
-                with open('submission_debug.log', 'a') as f:
-                    f.write(f"WORKAROUND: Trying raw SQL insert...\n")
+                from sqlalchemy import inspect, text
+                _log_submission(f"WORKAROUND: Trying raw SQL insert...")
+
+                # The rollback also undid a guest created by this submission
+                if inspect(guest).transient:
+                    db.session.add(guest)
+                    db.session.flush()
 
                 sql = text('''INSERT INTO photos
                     (guest_id, guest_name, filename, original_filename, wish_message,
@@ -850,12 +869,10 @@ def submit_memory():
                 })
                 db.session.commit()
 
-                with open('submission_debug.log', 'a') as f:
-                    f.write(f"SUCCESS: Raw SQL insert worked!\n")
+                _log_submission(f"SUCCESS: Raw SQL insert worked!")
 
             except Exception as sql_error:
-                with open('submission_debug.log', 'a') as f:
-                    f.write(f"ERROR: Raw SQL also failed: {sql_error}\n")
+                _log_submission(f"ERROR: Raw SQL also failed: {sql_error}", logging.ERROR)
                 db.session.rollback()
                 raise commit_error
         
@@ -1006,7 +1023,6 @@ def search_music():
                 '''
 
             # Step 4: Add AI suggestions container (only for mood queries when enabled)
-            from app.models import get_setting
             ai_enabled = get_setting('enable_ai_suggestions', 'true') == 'true'
 
             # Check if this is a mood query with debug logging
@@ -1111,7 +1127,6 @@ def search_music_ai():
             return '<div id="ai-suggestions-container" style="display: none;"></div>'
 
         # Check if AI suggestions are enabled
-        from app.models import get_setting
         ai_enabled = get_setting('enable_ai_suggestions', 'true') == 'true'
         current_app.logger.info(f"📊 AI endpoint: ai_enabled={ai_enabled}")
 
@@ -1314,8 +1329,7 @@ def suggest_music():
         if is_htmx_request():
             flash('Please enter your name first! 👋', 'error')
             return render_template('mobile/welcome.html',
-                                 party_title=get_setting('party_title', 'Birthday Celebration'),
-                                 host_name=get_setting('host_name', 'Birthday Star'))
+                                 **party_names())
         else:
             return redirect(url_for('mobile.welcome'))
     
@@ -2,9 +2,11 @@
 
 import io
 import os
+import shutil
 import uuid
 import hashlib
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional, Tuple
 from PIL import Image, ImageOps
 import aiofiles
@@ -19,6 +21,7 @@ class FileHandler:
     MAX_VIDEO_DURATION = 300  # seconds (5 minutes)
     TARGET_WIDTH = 1920
     TARGET_HEIGHT = 1080
+    UPLOAD_COPY_CHUNK = 1024 * 1024  # bytes per read when copying an upload to disk
     ALLOWED_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
     ALLOWED_VIDEO_EXTENSIONS = {'.mp4', '.mov', '.avi', '.mkv', '.webm'}
 
@@ -42,10 +45,14 @@ class FileHandler:
     
     def validate_file(self, file_data: bytes, filename: str) -> Tuple[bool, str]:
         """Validate uploaded file."""
-        if len(file_data) > self.MAX_FILE_SIZE:
+        return self._validate_upload(len(file_data), filename)
+
+    def _validate_upload(self, file_size: int, filename: str) -> Tuple[bool, str]:
+        """Validate an upload by its size and extension."""
+        if file_size > self.MAX_FILE_SIZE:
             return False, f"File size exceeds maximum limit of {self.MAX_FILE_SIZE // (1024*1024)}MB"
 
-        if len(file_data) == 0:
+        if file_size == 0:
             return False, "File is empty"
 
         _, ext = os.path.splitext(filename.lower())
@@ -122,9 +129,27 @@ class FileHandler:
     
     async def process_image(self, file_data: bytes, output_path: str) -> bool:
         """Process and resize image to target dimensions."""
+        return self._process_image(io.BytesIO(file_data), output_path)
+
+    def _draft_size(self, image) -> Tuple[int, int]:
+        """Size thumbnail() will produce for image, in its stored (pre-EXIF-rotation) orientation."""
+        box_width, box_height = self.TARGET_WIDTH, self.TARGET_HEIGHT
+        if image.getexif().get(0x0112) in (5, 6, 7, 8):  # Orientation: rotated 90 degrees
+            box_width, box_height = box_height, box_width
+        width, height = image.size
+        scale = min(box_width / width, box_height / height, 1)
+        return max(int(width * scale), 1), max(int(height * scale), 1)
+
+    def _process_image(self, source, output_path: str) -> bool:
+        """Decode an image from a file object, normalize and resize it, save as JPEG."""
         try:
-            # Open image from bytes
-            image = Image.open(io.BytesIO(file_data))
+            image = Image.open(source)
+
+            # Let libjpeg decode at 1/2, 1/4 or 1/8 scale (still at least the
+            # output size), so Lanczos below runs on far fewer pixels. This has
+            # to happen before the convert/transpose calls load the image.
+            if image.format == 'JPEG':
+                image.draft(None, self._draft_size(image))
             
             # Convert to RGB if necessary (handles RGBA, P mode, etc.)
             if image.mode in ('RGBA', 'LA', 'P'):
@@ -175,22 +200,9 @@ class FileHandler:
                 async with aiofiles.open(file_path, 'wb') as f:
                     await f.write(file_data)
 
-                # Validate video duration
-                is_valid_duration, duration_message, duration = self.validate_video_duration(file_path)
+                is_valid_duration, duration_message = self._finish_video(file_path)
                 if not is_valid_duration:
-                    # Remove the saved file if duration is invalid
-                    try:
-                        os.remove(file_path)
-                    except:
-                        pass
                     return False, duration_message, None
-
-                # Generate thumbnail for video
-                thumbnail_name = self.generate_video_thumbnail(file_path)
-                if thumbnail_name:
-                    print(f"Generated video thumbnail: {thumbnail_name}")
-                else:
-                    print("Failed to generate video thumbnail")
             else:
                 # Save other files as-is
                 async with aiofiles.open(file_path, 'wb') as f:
@@ -200,6 +212,66 @@ class FileHandler:
 
         except Exception as e:
             return False, f"Error saving file: {str(e)}", None
+
+    def save_upload(self, stream, filename: str, guest_name: str) -> Tuple[bool, str, Optional[str]]:
+        """Save an uploaded file object to disk without reading it into memory.
+
+        Werkzeug already spools large uploads to a temporary file; images are
+        decoded straight from it and videos are copied in UPLOAD_COPY_CHUNK
+        pieces, so a 100MB video never sits in the worker's memory.
+
+        Images are fully decoded and resized before this returns, so broken
+        files are rejected and the stored file (and its size) is final: media
+        is served as immutable and never rewritten.
+        """
+        try:
+            # Size from the spooled file itself, before anything is written
+            stream.seek(0, os.SEEK_END)
+            file_size = stream.tell()
+            stream.seek(0)
+
+            is_valid, message = self._validate_upload(file_size, filename)
+            if not is_valid:
+                return False, message, None
+
+            new_filename = self.generate_filename(filename, guest_name)
+            file_path = os.path.join(self.UPLOAD_DIR, new_filename)
+
+            if self.is_image(filename):
+                if not self._process_image(stream, file_path):
+                    return False, "Failed to process image", None
+            else:
+                with open(file_path, 'wb') as f:
+                    shutil.copyfileobj(stream, f, self.UPLOAD_COPY_CHUNK)
+
+                if self.is_video(filename):
+                    is_valid_duration, duration_message = self._finish_video(file_path)
+                    if not is_valid_duration:
+                        return False, duration_message, None
+
+            return True, "File saved successfully", new_filename
+
+        except Exception as e:
+            return False, f"Error saving file: {str(e)}", None
+
+    def _finish_video(self, file_path: str) -> Tuple[bool, str]:
+        """Check a saved video's duration (removing it if too long) and generate its thumbnail."""
+        is_valid_duration, duration_message, duration = self.validate_video_duration(file_path)
+        if not is_valid_duration:
+            # Remove the saved file if duration is invalid
+            try:
+                os.remove(file_path)
+            except:
+                pass
+            return False, duration_message
+
+        # Generate thumbnail for video
+        thumbnail_name = self.generate_video_thumbnail(file_path)
+        if thumbnail_name:
+            print(f"Generated video thumbnail: {thumbnail_name}")
+        else:
+            print("Failed to generate video thumbnail")
+        return True, duration_message
     
     def get_file_info(self, filename: str) -> dict:
         """Get information about an uploaded file."""
@@ -256,38 +328,46 @@ class FileHandler:
         Returns:
             datetime object of when media was created, or None if not found
         """
+        # One stat serves as the existence check, the cache key and the fallback
         try:
-            if not os.path.exists(filepath):
-                return None
+            mtime_ns = os.stat(filepath).st_mtime_ns
+        except OSError:
+            return None
+        return _read_creation_date(filepath, mtime_ns)
 
-            # For images, try EXIF data
-            if self.is_image(filepath):
-                try:
-                    with Image.open(filepath) as img:
-                        exif = img.getexif()
 
-                        # Try DateTimeOriginal first (when photo was taken)
-                        if 36867 in exif:  # EXIF DateTimeOriginal tag
-                            return datetime.strptime(exif[36867], '%Y:%m:%d %H:%M:%S')
+@lru_cache(maxsize=4096)
+def _read_creation_date(filepath: str, mtime_ns: int) -> Optional[datetime]:
+    """Read the creation date once per (path, mtime); memory book views reuse it.
 
-                        # Try DateTime tag as fallback
-                        elif 306 in exif:  # EXIF DateTime tag
-                            return datetime.strptime(exif[306], '%Y:%m:%d %H:%M:%S')
+    Module level so the cache holds only paths and timestamps, not a handler.
+    """
+    try:
+        # For images, try EXIF data
+        if os.path.splitext(filepath)[1].lower() in FileHandler.ALLOWED_IMAGE_EXTENSIONS:
+            try:
+                with Image.open(filepath) as img:
+                    exif = img.getexif()
 
-                except Exception as e:
-                    print(f"Error reading EXIF from {filepath}: {e}")
+                    # Try DateTimeOriginal first (when photo was taken)
+                    if 36867 in exif:  # EXIF DateTimeOriginal tag
+                        return datetime.strptime(exif[36867], '%Y:%m:%d %H:%M:%S')
 
-            # For videos, could add ffprobe metadata extraction here if needed
-            # For now, fall back to file modification time
+                    # Try DateTime tag as fallback
+                    elif 306 in exif:  # EXIF DateTime tag
+                        return datetime.strptime(exif[306], '%Y:%m:%d %H:%M:%S')
 
-        except Exception as e:
-            print(f"Error getting creation date from {filepath}: {e}")
+            except Exception as e:
+                print(f"Error reading EXIF from {filepath}: {e}")
 
-        # Fallback to file modification time
-        try:
-            return datetime.fromtimestamp(os.path.getmtime(filepath))
-        except:
-            return None
+        # For videos, could add ffprobe metadata extraction here if needed
+        # For now, fall back to file modification time
+
+    except Exception as e:
+        print(f"Error getting creation date from {filepath}: {e}")
+
+    # Fallback to file modification time
+    return datetime.fromtimestamp(mtime_ns / 1e9)
 
 
 # Create global instance
@@ -0,0 +1,128 @@
+"""Process-local snapshot of the slideshow's ordered photo ids.
+
+Every big screen polls the slideshow endpoints, and each poll used to load
+and hydrate the whole photos table. The snapshot keeps only the ordered ids
+in memory and reloads them when the (count, newest id, newest upload)
+signature changes, which any upload or delete does. Full rows are read by
+primary key for just the photos being shown.
+
+The signature is one aggregate query, re-run at most once per
+SIGNATURE_TTL. Photo inserts and deletes committed in this process drop it
+right away; other workers' changes show up within the TTL.
+
+Updates are deliberately not tracked: edits and displayed_at marks never
+change which ids exist or their upload order, so the snapshot stays
+valid. Anything that caches rendered row values must key on the rows
+themselves (see api._rows_tag), not on the signature.
+"""
+
+import threading
+import time
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session, object_session
+from app import db
+from app.models import Photo
+
+# Seconds a signature is trusted before checking the database again
+SIGNATURE_TTL = 1.0
+
+# Columns the slideshow, queue and /api/photos templates read
+_PHOTO_COLUMNS = (
+    Photo.id, Photo.filename, Photo.guest_name, Photo.wish_message,
+    Photo.uploaded_at, Photo.file_type, Photo.duration, Photo.thumbnail,
+)
+
+_SNAPSHOT_STMT = select(Photo.id).order_by(Photo.uploaded_at.asc())
+
+# (signature, ids), replaced as a whole so lock-free readers never see a mix
+_snapshot = (None, ())
+_snapshot_lock = threading.Lock()
+
+# (signature, monotonic time it was read)
+_signature_cache = (None, 0.0)
+
+
+def photo_signature():
+    """Return (count, newest id, newest upload time); changes whenever photos are added or deleted.
+
+    The upload time guards against SQLite reusing ids after a party reset.
+    """
+    global _signature_cache
+
+    signature, checked_at = _signature_cache
+    now = time.monotonic()
+    if signature is not None and now - checked_at < SIGNATURE_TTL:
+        return signature
+
+    signature = tuple(db.session.query(
+        func.count(Photo.id), func.max(Photo.id), func.max(Photo.uploaded_at)
+    ).one())
+    _signature_cache = (signature, now)
+    return signature
+
+
+def invalidate_photo_signature():
+    """Make the next photo_signature() call query the database."""
+    global _signature_cache
+    _signature_cache = (None, 0.0)
+
+
+@event.listens_for(Photo, 'after_insert')
+@event.listens_for(Photo, 'after_delete')
+def _flag_photo_change(mapper, connection, target):
+    """Note the change on the session; the cache is only dropped once it commits."""
+    session = object_session(target)
+    if session is not None:
+        session.info['photos_changed'] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _flag_bulk_photo_change(orm_execute_state):
+    """Bulk deletes and inserts (e.g. Photo.query.delete()) skip the mapper events above."""
+    if (orm_execute_state.is_delete or orm_execute_state.is_insert) \
+            and orm_execute_state.bind_mapper is Photo.__mapper__:
+        orm_execute_state.session.info['photos_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('photos_changed', False):
+        invalidate_photo_signature()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('photos_changed', None)
+
+
+def slideshow_photo_ids(signature=None):
+    """Return all photo ids, oldest first (slideshow order).
+
+    Pass the signature if the caller already fetched it to skip that query.
+    """
+    global _snapshot
+
+    if signature is None:
+        signature = photo_signature()
+
+    cached_signature, ids = _snapshot
+    if cached_signature == signature:
+        return ids
+
+    with _snapshot_lock:
+        # Another request may have rebuilt it while we waited
+        if _snapshot[0] != signature:
+            _snapshot = (signature, tuple(db.session.execute(_SNAPSHOT_STMT).scalars()))
+        return _snapshot[1]
+
+
+def load_photos(ids):
+    """Return read-only rows for the given ids in the same order, in one query.
+
+    Ids deleted since the snapshot was taken are skipped.
+    """
+    if not ids:
+        return []
+    rows = db.session.execute(select(*_PHOTO_COLUMNS).where(Photo.id.in_(ids))).all()
+    by_id = {row.id: row for row in rows}
+    return [by_id[photo_id] for photo_id in ids if photo_id in by_id]
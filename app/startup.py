@@ -0,0 +1,101 @@
+"""Database startup tasks: table creation and default settings.
+
+MIGRATION_MODE controls when these run:
+- 'async': in a background thread, so the app can answer /health right away
+- 'sync':  inline, before the first request is served
+- 'skip':  not at all (schema managed elsewhere)
+"""
+
+import datetime
+import threading
+from flask import request
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines
+    fcntl = None
+
+from app import db
+
+# Shared with /health so monitors can see startup progress
+migration_status = {
+    'state': 'pending',  # 'pending', 'running', 'succeeded', 'failed', 'skipped'
+    'mode': None,
+    'started_at': None,
+    'finished_at': None,
+    'error': None
+}
+
+_BLOCKING_STATES = ('pending', 'running')
+
+
+def create_missing_indexes():
+    """Create model indexes that are missing from tables created by an older version."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
+def run_migrations(app):
+    """Create tables and default settings, holding a file lock across workers."""
+    from app.models import init_default_settings
+
+    migration_status['state'] = 'running'
+    migration_status['started_at'] = datetime.datetime.now().isoformat()
+
+    lock_path = app.config['MIGRATION_LOCK_FILE']
+    try:
+        with open(lock_path, 'w') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with app.app_context():
+                    db.create_all()
+                    create_missing_indexes()
+                    init_default_settings()
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        migration_status['state'] = 'succeeded'
+    except Exception as e:
+        migration_status['state'] = 'failed'
+        migration_status['error'] = str(e)
+        app.logger.error(f"Database startup failed: {e}")
+    finally:
+        migration_status['finished_at'] = datetime.datetime.now().isoformat()
+
+
+def run_migrations_async(app):
+    """Run startup migrations in a daemon thread."""
+    thread = threading.Thread(target=run_migrations, args=(app,), name='StartupMigrations')
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def init_database(app):
+    """Run startup migrations according to MIGRATION_MODE."""
+    # Entry points may both import this; only start migrations once per app
+    if app.extensions.get('startup_migrations'):
+        return
+    app.extensions['startup_migrations'] = True
+
+    mode = app.config.get('MIGRATION_MODE', 'async')
+    migration_status['mode'] = mode
+
+    if mode == 'skip':
+        migration_status['state'] = 'skipped'
+        return
+
+    if mode == 'sync':
+        run_migrations(app)
+        return
+
+    @app.before_request
+    def wait_for_migrations():
+        """Answer 503 until tables exist, except for the health check."""
+        if migration_status['state'] in _BLOCKING_STATES and request.endpoint not in ('main.health_check', 'static'):
+            return {'status': 'starting', 'migration': migration_status}, 503
+
+    run_migrations_async(app)
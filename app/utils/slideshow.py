@@ -0,0 +1,52 @@
+"""Slideshow timing: which slide the big screens show at a given second."""
+
+from collections import namedtuple
+from app.models import get_settings_bulk
+
+# Settings the slideshow cycle math reads, with their defaults
+SLIDESHOW_SETTING_DEFAULTS = {
+    'slideshow_duration': '8',
+    'welcome_screen_interval_type': 'photos',
+    'welcome_screen_interval_value': '5',
+    'welcome_screen_duration': '8',
+}
+
+SlideshowTiming = namedtuple(
+    'SlideshowTiming', 'slideshow_duration interval_type interval_value welcome_duration'
+)
+
+
+def get_slideshow_timing():
+    """Read the slideshow settings from one settings snapshot, parsed."""
+    settings = get_settings_bulk(SLIDESHOW_SETTING_DEFAULTS)
+    return SlideshowTiming(
+        int(settings['slideshow_duration']),
+        settings['welcome_screen_interval_type'],
+        int(settings['welcome_screen_interval_value']),
+        int(settings['welcome_screen_duration']),
+    )
+
+
+def slideshow_position(current_time, timing):
+    """Return (showing welcome screen, photo slides shown so far) at current_time.
+
+    In 'photos' mode every (interval_value + 1)th slot is the welcome screen
+    and is not counted as a photo slide; during that slot the count already
+    equals the next photo's. 'time' mode shows it for welcome_duration
+    seconds every interval_value minutes on top of plain cycling.
+    """
+    total_cycles = current_time // timing.slideshow_duration
+
+    if timing.interval_type == 'photos':
+        cycle_group, position_in_group = divmod(total_cycles, timing.interval_value + 1)
+        return (position_in_group == timing.interval_value,
+                cycle_group * timing.interval_value + position_in_group)
+
+    if timing.interval_type == 'time':
+        minutes_elapsed, seconds_in_minute = divmod(current_time, 60)
+        showing_welcome = (timing.interval_value > 0
+                           and seconds_in_minute < timing.welcome_duration
+                           and minutes_elapsed % timing.interval_value == 0)
+        return showing_welcome, total_cycles
+
+    return False, total_cycles
@@ -2,6 +2,7 @@
 
 import os
 from pathlib import Path
+from sqlalchemy.pool import StaticPool
 
 class Config:
     """Base configuration."""
@@ -16,16 +17,33 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///birthday_party.db?charset=utf8'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {
-        'connect_args': {'check_same_thread': False},
+        'connect_args': {'check_same_thread': False, 'timeout': 30},
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 30,
+        'pool_recycle': 1800,
         'pool_pre_ping': True,
         'echo': False
     }
     
+    # Startup migrations: 'async' (background thread), 'sync' or 'skip'
+    MIGRATION_MODE = os.environ.get('MIGRATION_MODE') or 'async'
+    MIGRATION_LOCK_FILE = BASE_DIR / 'migrations.lock'
+    
     # File upload settings
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB max file size
     UPLOAD_FOLDER = BASE_DIR / 'media' / 'photos'
     VIDEO_FOLDER = BASE_DIR / 'media' / 'videos'
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp', 'mp4', 'mov', 'avi', 'mkv', 'webm'}
+    ALLOWED_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp', 'mp4', 'mov', 'avi', 'mkv', 'webm'})
+    
+    # When set (e.g. '/_internal_media'), media routes reply with X-Accel-Redirect
+    # and nginx streams the file from its matching internal location
+    MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX')
+    MEDIA_CACHE_MAX_AGE = 365 * 24 * 3600  # Uploaded filenames are unique, cache for a year
+    MUSIC_CACHE_MAX_AGE = 300  # Copied songs are named by title/artist and can be replaced; revalidated after this
+    
+    # Write the submit_memory trace to submission_debug.log (buffered)
+    SUBMISSION_DEBUG = os.environ.get('SUBMISSION_DEBUG', '').lower() in ('1', 'true', 'yes')
     
     # Music library settings
     MUSIC_LIBRARY_PATH = Path('/mnt/pixelparty/Music')  # Source library
@@ -54,15 +72,25 @@ class Config:
         os.makedirs(Config.MUSIC_COPY_FOLDER, exist_ok=True)
         os.makedirs(Config.EXPORT_FOLDER, exist_ok=True)
 
+        # In-memory SQLite only exists on a single connection, so share it
+        if app.config['SQLALCHEMY_DATABASE_URI'].split('?')[0] in ('sqlite://', 'sqlite:///:memory:'):
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+                'connect_args': {'check_same_thread': False},
+                'poolclass': StaticPool,
+                'echo': False
+            }
+
 
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
+    SUBMISSION_DEBUG = True  # Trace submit_memory to submission_debug.log
     
 
 class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
+    TEMPLATES_AUTO_RELOAD = False  # Compiled templates are never re-checked on disk
 
 
 config = {
@@ -0,0 +1,13 @@
+"""Gunicorn settings for the Docker image."""
+
+import os
+
+bind = '0.0.0.0:5000'
+
+# Threaded workers, so a slow upload or YouTube search doesn't hold up the
+# slideshow polls and music search behind it. Caches (settings, photo ids,
+# rendered fragments) are per process, so keep processes few and add threads.
+worker_class = 'gthread'
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = 120
@@ -9,7 +9,7 @@ import sys
 import os
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from tqdm import tqdm
 from mutagen import File
 from mutagen.id3 import ID3NoHeaderError
@@ -25,10 +25,19 @@ from config import Config
 SUPPORTED_FORMATS = {'.mp3', '.flac', '.m4a', '.ogg', '.wav', '.aac', '.wma'}
 
 class MusicIndexer:
-    def __init__(self, music_path: str = None, verbose: bool = False):
-        """Initialize the music indexer."""
+    # Rows written per bulk INSERT/UPDATE + commit
+    BATCH_SIZE = 500
+    
+    def __init__(self, music_path: str = None, verbose: bool = False,
+                 app=None, on_progress: Optional[Callable[[Dict], None]] = None):
+        """Initialize the music indexer.
+
+        Pass an existing Flask app (with its context already pushed) to run
+        in-process; on_progress then receives a dict for each progress event.
+        """
         self.music_path = Path(music_path or str(Config.MUSIC_LIBRARY_PATH))
         self.verbose = verbose
+        self.on_progress = on_progress
         self.stats = {
             'total_files': 0,
             'indexed': 0,
@@ -36,6 +45,15 @@ class MusicIndexer:
             'skipped': 0,
             'updated': 0
         }
+        self._existing = None
+        self._pending_inserts = []
+        self._pending_updates = []
+        
+        if app is not None:
+            # In-process run: reuse the caller's app and connection pool
+            self.app = app
+            self.app_context = None
+            return
         
         # Initialize Flask app and database context
         self.app = create_app()
@@ -48,9 +66,14 @@ class MusicIndexer:
     
     def __del__(self):
         """Clean up app context."""
-        if hasattr(self, 'app_context'):
+        if getattr(self, 'app_context', None):
             self.app_context.pop()
     
+    def _emit(self, event: str, **data):
+        """Report a progress event to the on_progress callback, if any."""
+        if self.on_progress:
+            self.on_progress({'event': event, **data})
+    
     def get_audio_files(self) -> List[Path]:
         """Scan directory recursively for audio files."""
         if not self.music_path.exists():
@@ -155,13 +178,22 @@ class MusicIndexer:
                 print(f"⚠️  Error reading {file_path.name}: {e}")
             return None
     
+    def _existing_tracks(self) -> Dict[str, tuple]:
+        """Map file_path -> (id, file_modified_at) for all indexed tracks, loaded once."""
+        if self._existing is None:
+            rows = db.session.query(
+                MusicLibrary.id, MusicLibrary.file_path, MusicLibrary.file_modified_at
+            ).all()
+            self._existing = {row.file_path: (row.id, row.file_modified_at) for row in rows}
+        return self._existing
+    
     def should_update_file(self, file_path: Path, force: bool = False) -> bool:
         """Check if file should be indexed/updated."""
         if force:
             return True
             
         # Check if file exists in database
-        existing = MusicLibrary.query.filter_by(file_path=str(file_path)).first()
+        existing = self._existing_tracks().get(str(file_path))
         if not existing:
             return True
             
@@ -169,75 +201,57 @@ class MusicIndexer:
         file_stat = file_path.stat()
         file_modified_at = datetime.fromtimestamp(file_stat.st_mtime)
         
-        if existing.file_modified_at and file_modified_at <= existing.file_modified_at:
+        indexed_modified_at = existing[1]
+        if indexed_modified_at and file_modified_at <= indexed_modified_at:
             return False
             
         return True
     
     def index_file(self, metadata: Dict, force: bool = False) -> bool:
-        """Index or update a single file."""
+        """Queue a single file for insert or update; rows are written in bulk batches."""
         try:
             file_path = metadata['file_path']
             
             # Check if record exists
-            existing = MusicLibrary.query.filter_by(file_path=file_path).first()
+            existing = self._existing_tracks().get(file_path)
             
             if existing and not force and not self.should_update_file(Path(file_path)):
                 self.stats['skipped'] += 1
                 return True
             
-            # Create or update record
+            row = {
+                'filename': metadata['filename'],
+                'title': metadata['title'],
+                'artist': metadata['artist'],
+                'album': metadata['album'],
+                'genre': metadata['genre'],
+                'duration': metadata['duration'],
+                'file_size': metadata['file_size'],
+                'file_modified_at': metadata['file_modified_at'],
+                'indexed_at': datetime.utcnow(),
+                'index_status': 'indexed',
+                'index_error': None,
+                
+                # Lowercase fields for case-insensitive search
+                'title_lower': (metadata['title'] or '').lower(),
+                'artist_lower': (metadata['artist'] or '').lower(),
+                'album_lower': (metadata['album'] or '').lower(),
+                'genre_lower': (metadata['genre'] or '').lower()
+            }
+            
             if existing:
                 # Update existing record
-                existing.filename = metadata['filename']
-                existing.title = metadata['title']
-                existing.artist = metadata['artist']
-                existing.album = metadata['album']
-                existing.genre = metadata['genre']
-                existing.duration = metadata['duration']
-                existing.file_size = metadata['file_size']
-                existing.file_modified_at = metadata['file_modified_at']
-                existing.indexed_at = datetime.utcnow()
-                existing.index_status = 'indexed'
-                existing.index_error = None
-                
-                # Update lowercase fields
-                existing.title_lower = (metadata['title'] or '').lower()
-                existing.artist_lower = (metadata['artist'] or '').lower()
-                existing.album_lower = (metadata['album'] or '').lower()
-                existing.genre_lower = (metadata['genre'] or '').lower()
-                
-                record = existing
+                row['id'] = existing[0]
+                self._pending_updates.append(row)
                 self.stats['updated'] += 1
-                
             else:
                 # Create new record
-                record = MusicLibrary(
-                    filename=metadata['filename'],
-                    title=metadata['title'],
-                    artist=metadata['artist'],
-                    album=metadata['album'],
-                    genre=metadata['genre'],
-                    duration=metadata['duration'],
-                    file_path=file_path,
-                    file_size=metadata['file_size'],
-                    file_modified_at=metadata['file_modified_at'],
-                    indexed_at=datetime.utcnow(),
-                    index_status='indexed',
-                    
-                    # Lowercase fields for case-insensitive search
-                    title_lower=(metadata['title'] or '').lower(),
-                    artist_lower=(metadata['artist'] or '').lower(),
-                    album_lower=(metadata['album'] or '').lower(),
-                    genre_lower=(metadata['genre'] or '').lower()
-                )
-                
-                db.session.add(record)
+                row['file_path'] = file_path
+                self._pending_inserts.append(row)
                 self.stats['indexed'] += 1
             
-            # Commit every 100 records or so to avoid memory issues
-            if (self.stats['indexed'] + self.stats['updated']) % 100 == 0:
-                db.session.commit()
+            if len(self._pending_inserts) + len(self._pending_updates) >= self.BATCH_SIZE:
+                self.flush()
             
             return True
             
@@ -258,24 +272,42 @@ class MusicIndexer:
                 
             return False
     
+    def flush(self):
+        """Write queued rows with bulk INSERT/UPDATE statements and commit."""
+        if not self._pending_inserts and not self._pending_updates:
+            return
+        
+        try:
+            if self._pending_inserts:
+                db.session.bulk_insert_mappings(MusicLibrary, self._pending_inserts)
+            if self._pending_updates:
+                db.session.bulk_update_mappings(MusicLibrary, self._pending_updates)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            failed = len(self._pending_inserts) + len(self._pending_updates)
+            print(f"❌ Error writing batch of {failed} tracks: {e}")
+            self.stats['indexed'] -= len(self._pending_inserts)
+            self.stats['updated'] -= len(self._pending_updates)
+            self.stats['errors'] += failed
+        finally:
+            self._pending_inserts = []
+            self._pending_updates = []
+    
     def cleanup_missing_files(self):
         """Remove database entries for files that no longer exist."""
         print("🧹 Cleaning up missing files...")
         
-        missing_count = 0
-        all_records = MusicLibrary.query.all()
+        rows = db.session.query(MusicLibrary.id, MusicLibrary.file_path).all()
+        missing_ids = [row.id for row in rows if not os.path.exists(row.file_path)]
         
-        for record in all_records:
-            if not Path(record.file_path).exists():
-                db.session.delete(record)
-                missing_count += 1
-                
-                if missing_count % 100 == 0:
-                    db.session.commit()
-        
-        if missing_count > 0:
+        for start in range(0, len(missing_ids), self.BATCH_SIZE):
+            batch = missing_ids[start:start + self.BATCH_SIZE]
+            MusicLibrary.query.filter(MusicLibrary.id.in_(batch)).delete(synchronize_session=False)
             db.session.commit()
-            print(f"🗑️  Removed {missing_count} missing files from database")
+        
+        if missing_ids:
+            print(f"🗑️  Removed {len(missing_ids)} missing files from database")
     
     def run(self, force: bool = False, cleanup: bool = True) -> Dict:
         """Run the indexing process."""
@@ -293,14 +325,19 @@ class MusicIndexer:
             return self.stats
         
         print(f"📊 Found {self.stats['total_files']} audio files")
+        self._emit('total', total=self.stats['total_files'])
         
-        # Process files with progress bar
-        with tqdm(total=self.stats['total_files'], desc="Indexing", unit="files") as pbar:
+        # Process files with progress bar (terminal only)
+        with tqdm(total=self.stats['total_files'], desc="Indexing", unit="files",
+                  disable=self.on_progress is not None) as pbar:
             
-            for file_path in audio_files:
+            for position, file_path in enumerate(audio_files):
                 
                 # Update progress bar with current file
                 pbar.set_postfix_str(f"Processing {file_path.name}")
+                # Percent done, for the dashboard's <progress max="100">
+                self._emit('file', current_file=file_path.name,
+                           progress=(position + 1) * 100 // self.stats['total_files'])
                 
                 # Skip if not forcing and file doesn't need update
                 if not force and not self.should_update_file(file_path):
@@ -319,9 +356,9 @@ class MusicIndexer:
                 
                 pbar.update(1)
         
-        # Final commit
+        # Write the final partial batch
         try:
-            db.session.commit()
+            self.flush()
         except Exception as e:
             print(f"❌ Error committing final batch: {e}")
         
@@ -347,6 +384,7 @@ class MusicIndexer:
             rate = (self.stats['indexed'] + self.stats['updated']) / elapsed.total_seconds()
             print(f"🚀 Processing rate: {rate:.2f} files/second")
         
+        self._emit('done', stats=dict(self.stats))
         return self.stats
     
     def show_stats(self) -> Dict:
@@ -420,6 +458,17 @@ class MusicIndexer:
             return {}
 
 
+def run_index(app, force: bool = False, on_progress: Optional[Callable[[Dict], None]] = None,
+              cleanup: bool = True, verbose: bool = True) -> Dict:
+    """Index the library inside an existing Flask app (used by the admin panel)."""
+    with app.app_context():
+        try:
+            indexer = MusicIndexer(verbose=verbose, app=app, on_progress=on_progress)
+            return indexer.run(force=force, cleanup=cleanup)
+        finally:
+            db.session.remove()
+
+
 def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(
@@ -1,6 +1,8 @@
 """Music library search functionality."""
 
 import sqlite3
+import time
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Any
 from app.models import MusicLibrary
@@ -94,36 +96,27 @@ class MusicSearch:
     def get_library_stats(self) -> Dict[str, Any]:
         """Get music library statistics."""
         try:
-            total_tracks = MusicLibrary.query.count()
+            # Everything in one aggregate query instead of loading every track
+            def distinct_known(column):
+                # Unique non-empty values, excluding 'Unknown'
+                return db.func.count(db.distinct(
+                    db.case((column.notin_(('', 'Unknown')), column))
+                ))
             
-            if total_tracks == 0:
-                return {
-                    'total_tracks': 0,
-                    'total_artists': 0,
-                    'total_albums': 0,
-                    'total_duration': 0,
-                    'total_size': 0
-                }
-            
-            # Get all records for detailed stats
-            all_tracks = MusicLibrary.query.all()
-            
-            # Calculate unique counts (excluding 'Unknown' values)
-            unique_artists = len(set(track.artist for track in all_tracks 
-                                   if track.artist and track.artist != 'Unknown'))
-            unique_albums = len(set(track.album for track in all_tracks 
-                                  if track.album and track.album != 'Unknown'))
-            
-            # Calculate totals
-            total_duration = sum(track.duration or 0 for track in all_tracks)
-            total_size = sum(track.file_size or 0 for track in all_tracks)
+            row = db.session.execute(db.select(
+                db.func.count(MusicLibrary.id),
+                distinct_known(MusicLibrary.artist),
+                distinct_known(MusicLibrary.album),
+                db.func.coalesce(db.func.sum(MusicLibrary.duration), 0),
+                db.func.coalesce(db.func.sum(MusicLibrary.file_size), 0),
+            )).one()
             
             return {
-                'total_tracks': total_tracks,
-                'total_artists': unique_artists,
-                'total_albums': unique_albums,
-                'total_duration': total_duration,
-                'total_size': total_size
+                'total_tracks': row[0],
+                'total_artists': row[1],
+                'total_albums': row[2],
+                'total_duration': row[3],
+                'total_size': row[4]
             }
             
         except Exception as e:
@@ -158,4 +151,24 @@ class MusicSearch:
         }
 
 # Create global instance for easy import
-music_search = MusicSearch()
\ No newline at end of file
+music_search = MusicSearch()
+
+# Seconds the music dashboard and big screen stats polls reuse library stats;
+# cleared when the index changes
+LIBRARY_STATS_TTL = 10
+
+
+@lru_cache(maxsize=1)
+def _library_stats(window):
+    """Compute library stats once per TTL window."""
+    return music_search.get_library_stats()
+
+
+def get_recent_library_stats():
+    """music_search.get_library_stats(), reused for up to LIBRARY_STATS_TTL seconds."""
+    return _library_stats(int(time.time()) // LIBRARY_STATS_TTL)
+
+
+def invalidate_library_stats():
+    """Make the next get_recent_library_stats() call query the database."""
+    _library_stats.cache_clear()
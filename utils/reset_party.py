@@ -19,22 +19,18 @@ import argparse
 import shutil
 from pathlib import Path
 
+# Relative to the project root, where the script is run from
+MEDIA_DIRECTORIES = ['media/photos', 'media/videos', 'media/music']
+
 def setup_app_context():
     """Set up Flask app context for database operations."""
     try:
         from app import create_app, db
-        from app.models import Guest, Photo, MusicQueue, MusicLibrary, Settings
         
         app = create_app()
         app.app_context().push()
         
-        return app, db, {
-            'Guest': Guest,
-            'Photo': Photo, 
-            'MusicQueue': MusicQueue,
-            'MusicLibrary': MusicLibrary,
-            'Settings': Settings
-        }
+        return app, db, get_models()
     except ImportError as e:
         print(f"❌ Error importing Flask app: {e}")
         print("Make sure you're running this script from the PixelParty directory.")
@@ -43,7 +39,27 @@ def setup_app_context():
         print(f"❌ Error setting up app context: {e}")
         sys.exit(1)
 
-def get_current_state(db, models):
+def get_models():
+    """Return the model classes keyed by name, as the cleanup helpers expect."""
+    from app.models import Guest, Photo, MusicQueue, MusicLibrary, Settings
+
+    return {
+        'Guest': Guest,
+        'Photo': Photo,
+        'MusicQueue': MusicQueue,
+        'MusicLibrary': MusicLibrary,
+        'Settings': Settings
+    }
+
+def get_media_directories(app):
+    """Media folders to empty, taken from the app config so cwd doesn't matter."""
+    return [
+        str(app.config['UPLOAD_FOLDER']),
+        str(app.config['VIDEO_FOLDER']),
+        str(app.config['MUSIC_COPY_FOLDER'])
+    ]
+
+def get_current_state(db, models, directories=MEDIA_DIRECTORIES):
     """Get current database and file counts."""
     try:
         state = {
@@ -58,8 +74,7 @@ def get_current_state(db, models):
         }
         
         # Count files in media directories
-        media_dirs = ['media/photos', 'media/videos', 'media/music']
-        for dir_path in media_dirs:
+        for dir_path in directories:
             if os.path.exists(dir_path):
                 files = [f for f in os.listdir(dir_path) if os.path.isfile(os.path.join(dir_path, f))]
                 state['files'][dir_path] = len(files)
@@ -101,10 +116,9 @@ def clean_database_tables(db, models, dry_run=False):
     
     return results
 
-def clean_media_directories(dry_run=False):
+def clean_media_directories(dry_run=False, directories=MEDIA_DIRECTORIES):
     """Clean files from media directories."""
     results = {}
-    directories = ['media/photos', 'media/videos', 'media/music']
     
     for dir_path in directories:
         try:
@@ -192,6 +206,18 @@ def print_summary(db_results, media_results, dry_run=False):
     if not dry_run:
         print("\n✨ Party reset complete! Your PixelParty is ready for the next celebration! 🎉")
 
+def reset(app):
+    """Reset the party in-process, inside an existing app context.
+
+    Used by the admin "reset party" button. Returns the per-table and
+    per-directory results from the cleanup helpers.
+    """
+    from app import db
+
+    db_results = clean_database_tables(db, get_models())
+    media_results = clean_media_directories(directories=get_media_directories(app))
+    return {'database': db_results, 'media': media_results}
+
 def main():
     parser = argparse.ArgumentParser(description='Reset PixelParty for new celebration')
     parser.add_argument('--dry-run', action='store_true', 
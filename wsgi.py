@@ -1,16 +1,14 @@
 """WSGI entry point for Gunicorn."""
 
 import os
-from app import create_app, db
-from app.models import init_default_settings
+from app import create_app
+from app.startup import init_database
 
 # Create Flask app
 app = create_app(os.environ.get('FLASK_CONFIG', 'production'))
 
-# Initialize database
-with app.app_context():
-    db.create_all()
-    init_default_settings()
+# Initialize database (in the background unless MIGRATION_MODE says otherwise)
+init_database(app)
 
 if __name__ == "__main__":
     app.run()
\ No newline at end of file